@@ -1,3 +1,4 @@
+import os
 from video_player import VideoPlayer
 
 title = "csci576-project"
@@ -11,6 +12,31 @@ subshot_threshold = 4
 window_width = 1500
 window_height = 800
 
+program_fps = 60
+# number of processes used to index a video
+segmentation_workers = os.cpu_count() or 1
+# frame width and frame step used to detect cuts. with a step, cuts are found
+# at reduced thresholds and checked at full frame rate around each of them
+analysis_width = 160
+analysis_stride = 1
+# file to write the stage times of every frame to as json lines, None to disable
+profile_trace_path = None
+# transcode videos once to an intra-only proxy at display size for fast seeking
+playback_proxy = False
+# sleep until there is input while nothing is playing, instead of redrawing
+idle_wait = True
+# also make scene cuts of shot cuts at long silences or abrupt changes of the audio
+audio_assisted = True
+# keep playing and indexing the frames appended to the opened video, for
+# recordings that are still being written
+follow = False
+# group consecutive shots of similar colours into scenes instead of using the
+# scene threshold, from 0 (one scene) to 1 (every shot a scene), None to disable
+scene_similarity = None
+# directory of the indexes written by python -m segmentation -o, None to look
+# for them next to the videos
+index_dir = None
+
 if __name__ == "__main__":
     player = VideoPlayer(
         title,
@@ -20,5 +46,16 @@ if __name__ == "__main__":
         shot_threshold,
         subshot_threshold,
         background_color,
+        program_fps,
+        segmentation_workers,
+        analysis_width,
+        analysis_stride,
+        profile_trace_path,
+        playback_proxy,
+        idle_wait,
+        audio_assisted,
+        follow,
+        scene_similarity,
+        index_dir,
     )
     player.start()
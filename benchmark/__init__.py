@@ -0,0 +1 @@
+from benchmark.synthetic import make_video, make_audio
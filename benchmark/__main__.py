@@ -0,0 +1,274 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+# render without a display or sound device unless one is configured
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import segmentation
+import ui
+from benchmark.synthetic import make_video, make_audio
+
+
+# summarize durations in seconds as milliseconds
+def summarize(times: list[float]) -> dict:
+    if not times:
+        return {"count": 0}
+    times = np.array(times) * 1000
+    return {
+        "count": len(times),
+        "mean_ms": float(times.mean()),
+        "median_ms": float(np.median(times)),
+        "p95_ms": float(np.percentile(times, 95)),
+        "max_ms": float(times.max()),
+    }
+
+
+# throughput and cut accuracy of the segmenter with a few configurations
+def bench_segmentation(video_path: str, cuts: list[int]) -> dict:
+    configs = {
+        "full_width": dict(),
+        "analysis_width_160": dict(analysis_width=160),
+        "parallel": dict(analysis_width=160, workers=os.cpu_count() or 1),
+        "stride_4": dict(analysis_width=160, stride=4),
+    }
+    results = {}
+    for name, config in configs.items():
+        segmenter = segmentation.Segmenter(8, 6, 4, **config)
+        start = time.perf_counter()
+        index = segmenter.analyze(video_path)
+        elapsed = time.perf_counter() - start
+
+        found = set(scene.start for scene in index.scenes[1:])
+        hits = len(found & set(cuts))
+        results[name] = {
+            "frames": index.frame_count,
+            "seconds": elapsed,
+            "fps": index.frame_count / elapsed,
+            "recall": hits / max(1, len(cuts)),
+            "precision": hits / max(1, len(found)),
+        }
+    return results
+
+
+# time of updates that decode and render a new frame while playing
+def bench_playback(video_path: str, audio_path: str, duration: float) -> dict:
+    screen = pygame.display.set_mode((980, 560))
+    frame = ui.VideoFrame(screen, 10, 10, 960, 540, "#383c44")
+    frame.load(video_path, audio_path)
+    frame.play()
+
+    times = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        shown = frame.sync.shown_frames
+        update_start = time.perf_counter()
+        ui.UIElement.update_all("#000000")
+        update_time = time.perf_counter() - update_start
+        if frame.sync.shown_frames > shown:
+            times.append(update_time)
+
+    sync = frame.sync
+    result = summarize(times)
+    result.update(
+        {
+            "shown_frames": sync.shown_frames,
+            "dropped_frames": sync.dropped_frames,
+            "skipped_frames": sync.skipped_frames,
+            "mean_drift_ms": sync.mean_drift * 1000,
+            "max_drift_ms": sync.max_drift * 1000,
+        }
+    )
+    frame.close()
+    frame.delete()
+    return result
+
+
+# time jump_to takes to show the frame at random positions
+def bench_seek(
+    video_path: str, audio_path: str, duration: float, count: int, seed: int
+) -> dict:
+    screen = pygame.display.set_mode((980, 560))
+    frame = ui.VideoFrame(screen, 10, 10, 960, 540, "#383c44")
+    frame.load(video_path, audio_path)
+    keyframes, _ = segmentation.read_keyframes(video_path)
+    frame.set_keyframes(keyframes)
+
+    rng = np.random.default_rng(seed)
+    times = []
+    latencies = []
+    for target in rng.uniform(0, duration, count):
+        start = time.perf_counter()
+        frame.jump_to(float(target))
+        times.append(time.perf_counter() - start)
+        latencies.append(frame.seek_latency)
+    frame.close()
+    frame.delete()
+
+    result = summarize(times)
+    result["decoder_latency"] = summarize(latencies)
+    return result
+
+
+# frame time of scrolling a list with many rows
+def bench_scroll_view(row_count: int, frame_count: int) -> dict:
+    screen = pygame.display.set_mode((500, 780))
+    font = ui.TextRenderer.get_font(None, 15)
+    scroll_view = ui.ScrollView(screen, 0, 0, 500, 780)
+
+    def make_row():
+        return ui.Button(screen, 0, 0, 110, 20, font, "")
+
+    def bind_row(button, row):
+        button.x = 5 + row[1] * 115
+        button.label = row[0]
+
+    scroll_view.set_row_factory(25, make_row, bind_row, 5)
+    start = time.perf_counter()
+    scroll_view.add_rows(
+        [
+            (segmentation.LEVEL_NAMES[i % 3] + "_" + str(i), i % 3)
+            for i in range(row_count)
+        ]
+    )
+    add_time = time.perf_counter() - start
+
+    # the mouse is at the origin, over the scroll view
+    times = []
+    for i in range(frame_count):
+        start = time.perf_counter()
+        scroll_view.scroll(False)
+        ui.UIElement.update_all("#000000")
+        times.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    scroll_view.clear_content()
+    clear_time = time.perf_counter() - start
+    scroll_view.delete()
+
+    result = summarize(times)
+    result.update(
+        {"rows": row_count, "add_ms": add_time * 1000, "clear_ms": clear_time * 1000}
+    )
+    return result
+
+
+# get the current commit of the repository, None if unknown
+def get_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# flatten nested results to "a.b.c" keys
+def flatten(results: dict, prefix: str = "") -> dict:
+    values = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            values.update(flatten(value, prefix + key + "."))
+        else:
+            values[prefix + key] = value
+    return values
+
+
+# print the ratio of each metric to a previous run
+def compare(results: dict, previous: dict) -> None:
+    current, previous = flatten(results), flatten(previous)
+    for key, value in current.items():
+        old = previous.get(key)
+        if isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+            print(
+                "{:60} {:>12.3f} {:>12.3f} {:>8.2f}x".format(
+                    key, old, value, value / old
+                )
+            )
+
+
+# run the benchmarks and write the results as json, e.g.
+#   python -m benchmark -o results.json --compare previous.json
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmark", description="measure the performance"
+    )
+    parser.add_argument(
+        "-o", "--output", help="default: benchmark_results/<commit>.json"
+    )
+    parser.add_argument("--compare", help="results of a previous run")
+    parser.add_argument("--frames", type=int, default=1800, help="of the test video")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--playback-seconds", type=float, default=5)
+    parser.add_argument("--seeks", type=int, default=30)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--scroll-frames", type=int, default=300)
+    args = parser.parse_args()
+
+    fps = 30
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        video_path = os.path.join(directory, "synthetic.mp4")
+        audio_path = os.path.join(directory, "synthetic.wav")
+        cuts = make_video(video_path, args.frames, fps, seed=args.seed)
+        make_audio(audio_path, args.frames / fps)
+
+        print("segmentation")
+        results["segmentation"] = bench_segmentation(video_path, cuts)
+
+        pygame.init()
+        try:
+            print("playback")
+            results["playback"] = bench_playback(
+                video_path, audio_path, args.playback_seconds
+            )
+            print("seek")
+            results["seek"] = bench_seek(
+                video_path, audio_path, args.frames / fps, args.seeks, args.seed
+            )
+            print("scroll view")
+            results["scroll_view"] = bench_scroll_view(args.rows, args.scroll_frames)
+        finally:
+            pygame.quit()
+
+    commit = get_commit()
+    data = {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": vars(args),
+        "results": results,
+    }
+
+    output = args.output or os.path.join(
+        "benchmark_results", "{}.json".format(commit or "unknown")
+    )
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(data, file, indent=2)
+    print(json.dumps(results, indent=2))
+    print("written to", output)
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file)["results"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
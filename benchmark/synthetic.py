@@ -0,0 +1,52 @@
+from __future__ import annotations
+import wave
+import cv2
+import numpy as np
+
+
+# write a deterministic video of static random-color scenes with a moving
+# square, and return the frames where scenes start (excluding 0)
+def make_video(
+    path: str,
+    frame_count: int = 1800,
+    fps: float = 30,
+    size: tuple[int, int] = (480, 270),
+    min_scene_len: int = 30,
+    max_scene_len: int = 150,
+    seed: int = 0,
+) -> list[int]:
+    rng = np.random.default_rng(seed)
+    width, height = size
+
+    cuts = []
+    cut = int(rng.integers(min_scene_len, max_scene_len))
+    while cut < frame_count:
+        cuts.append(cut)
+        cut += int(rng.integers(min_scene_len, max_scene_len))
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    if not writer.isOpened():
+        raise IOError("cannot write video: " + path)
+
+    next_cuts = set(cuts) | {0}
+    background = None
+    for i in range(frame_count):
+        if i in next_cuts:
+            blocks = rng.integers(0, 255, (height // 30, width // 30, 3), np.uint8)
+            background = cv2.resize(blocks, size)
+        frame = background.copy()
+        x = i * 4 % max(1, width - 40)
+        y = height // 3
+        cv2.rectangle(frame, (x, y), (x + 40, y + 40), (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return cuts
+
+
+# write a silent wav file with the given duration in seconds
+def make_audio(path: str, duration: float, sample_rate: int = 44100) -> None:
+    with wave.open(path, "wb") as file:
+        file.setnchannels(2)
+        file.setsampwidth(2)
+        file.setframerate(sample_rate)
+        file.writeframes(bytes(4 * int(duration * sample_rate)))
@@ -0,0 +1,10 @@
+from segmentation.segment import Segment, LEVEL_NAMES
+from segmentation.video_index import VideoIndex
+from segmentation.segmenter import Segmenter
+from segmentation.index_cache import IndexCache
+from segmentation.worker import SegmentationWorker
+from segmentation.keyframes import read_keyframes
+from segmentation.export import write_json, read_json, write_csv
+from segmentation.proxy import make_proxy
+from segmentation.batch import find_videos, find_audio, index_video, index_videos
+from segmentation.audio import AudioFeatures, read_audio_features, find_audio_boundaries
@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import sys
+import time
+from segmentation.segmenter import Segmenter
+from segmentation.index_cache import IndexCache
+from segmentation.batch import find_videos, index_videos
+
+
+# index videos without a display, e.g.
+#   python -m segmentation videos/ -f json -f csv -j 4
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m segmentation",
+        description="index the scenes, shots and subshots of videos",
+    )
+    parser.add_argument("paths", nargs="+", help="videos or directories of videos")
+    parser.add_argument("-o", "--output-dir", help="default: next to each video")
+    parser.add_argument(
+        "-f",
+        "--format",
+        action="append",
+        choices=["json", "csv"],
+        help="index formats to write, default: json",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of videos indexed at once",
+    )
+    parser.add_argument("--scene-threshold", type=float, default=8)
+    parser.add_argument("--shot-threshold", type=float, default=6)
+    parser.add_argument("--subshot-threshold", type=float, default=4)
+    parser.add_argument(
+        "--scene-similarity",
+        type=float,
+        help="group shots of similar colours into scenes instead of thresholding",
+    )
+    parser.add_argument("--analysis-width", type=int, default=160)
+    parser.add_argument("--stride", type=int, default=1)
+    parser.add_argument("--no-recursive", action="store_true")
+    parser.add_argument(
+        "--no-cache", action="store_true", help="do not share indexes with the player"
+    )
+    parser.add_argument(
+        "--proxy",
+        action="store_true",
+        help="also make the proxies the player seeks in, needs the cache",
+    )
+    parser.add_argument(
+        "--no-audio",
+        action="store_true",
+        help="do not confirm scene cuts with the wav file next to each video",
+    )
+    parser.add_argument("--report", help="write per-video results as json")
+    args = parser.parse_args()
+
+    videos = find_videos(args.paths, not args.no_recursive)
+    if not videos:
+        print("no videos found", file=sys.stderr)
+        return 1
+
+    # with several videos at once each is scored in a single process,
+    # a single video is scored in parallel chunks instead
+    jobs = max(1, min(args.jobs, len(videos)))
+    segmenter = Segmenter(
+        args.scene_threshold,
+        args.shot_threshold,
+        args.subshot_threshold,
+        workers=max(1, (os.cpu_count() or 1) // jobs),
+        analysis_width=args.analysis_width,
+        stride=args.stride,
+        scene_similarity=args.scene_similarity,
+    )
+    cache = None if args.no_cache else IndexCache()
+
+    results = []
+    start = time.perf_counter()
+    for result in index_videos(
+        videos,
+        segmenter,
+        args.output_dir,
+        tuple(args.format or ["json"]),
+        cache,
+        jobs,
+        (960, 540) if args.proxy else None,
+        not args.no_audio,
+    ):
+        results.append(result)
+        if result.error:
+            print("{}: failed: {}".format(result.video_path, result.error))
+            continue
+        print(
+            "{}: {} scenes, {} shots, {} subshots, {} frames in {:.2f}s ({:.1f} fps){}".format(
+                result.video_path,
+                *result.counts,
+                result.frame_count,
+                result.elapsed,
+                result.fps,
+                " (cached)" if result.cached else "",
+            )
+        )
+    elapsed = time.perf_counter() - start
+
+    frame_count = sum(result.frame_count for result in results if not result.cached)
+    failed = sum(1 for result in results if result.error)
+    print(
+        "{} videos, {} failed, {} frames in {:.2f}s ({:.1f} fps)".format(
+            len(results), failed, frame_count, elapsed, frame_count / max(elapsed, 1e-9)
+        )
+    )
+
+    if args.report:
+        with open(args.report, "w") as file:
+            json.dump([result.to_dict() for result in results], file, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
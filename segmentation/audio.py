@@ -0,0 +1,143 @@
+from __future__ import annotations
+import wave
+import numpy as np
+from .scorer import get_adaptive_ratios
+
+HOP_LENGTH = 0.02  # seconds between feature windows
+SILENCE_DB = -45.0  # energy below this is silence, in dB of full scale
+MIN_SILENCE = 0.3  # in seconds
+FLUX_WINDOW = 50  # windows on each side of a window to compare its flux to
+FLUX_RATIO = 6.0  # of the flux of a window to the mean flux around it
+
+
+# windowed features of an audio track, one value per hop_length seconds:
+# the rms energy in dB of full scale and the spectral flux to the window before
+class AudioFeatures:
+    def __init__(self, hop_length: float, energy: np.ndarray, flux: np.ndarray) -> None:
+        self.hop_length = hop_length
+        self.energy = np.asarray(energy, dtype=np.float32)
+        self.flux = np.asarray(flux, dtype=np.float32)
+
+    @property
+    def duration(self) -> float:
+        return len(self.energy) * self.hop_length
+
+    # convert a window number to seconds
+    def to_seconds(self, window: int | np.ndarray) -> float | np.ndarray:
+        return window * self.hop_length
+
+
+# read up to count frames of a wav file as samples of dtype, 24 bit samples
+# are widened to 32 bit
+def read_samples(file: wave.Wave_read, count: int, dtype: type) -> np.ndarray:
+    data = file.readframes(count)
+    if file.getsampwidth() != 3:
+        return np.frombuffer(data, dtype)
+
+    raw = np.frombuffer(data, np.uint8)
+    samples = np.zeros((len(raw) // 3, 4), np.uint8)
+    samples[:, 1:] = raw[: len(samples) * 3].reshape(-1, 3)
+    return samples.view("<i4").ravel()
+
+
+# compute the features of a pcm wav file, block_length seconds at a time so
+# long tracks are never fully in memory
+def read_audio_features(
+    path: str, hop_length: float = HOP_LENGTH, block_length: float = 30.0
+) -> AudioFeatures:
+    with wave.open(path, "rb") as file:
+        channels = file.getnchannels()
+        width = file.getsampwidth()
+        rate = file.getframerate()
+        dtype = {1: np.uint8, 2: np.int16, 3: np.int32, 4: np.int32}.get(width)
+        if dtype is None:
+            raise ValueError("unsupported sample width: {}".format(width))
+
+        hop = max(1, round(hop_length * rate))
+        block = max(1, round(block_length / hop_length)) * hop
+        window = np.hanning(hop).astype(np.float32)
+        scale = float(1 << (8 * np.dtype(dtype).itemsize - 1))
+
+        energies, fluxes = [], []
+        last = None  # spectrum of the last window of the previous block
+        while True:
+            samples = read_samples(file, block, dtype)
+            count = len(samples) // (channels * hop)
+            if count == 0:
+                break
+
+            # mix down to mono windows in [-1, 1], 8 bit samples are unsigned
+            samples = samples[: count * hop * channels].reshape(count, hop, channels)
+            mono = samples.mean(axis=2, dtype=np.float32)
+            if width == 1:
+                mono -= 128
+            mono /= scale
+
+            rms = np.sqrt(np.mean(mono * mono, axis=1))
+            energies.append(20 * np.log10(np.maximum(rms, 1e-10)))
+
+            spectra = np.abs(np.fft.rfft(mono * window, axis=1)).astype(np.float32)
+            previous = np.concatenate(
+                [spectra[:1] if last is None else last[np.newaxis], spectra[:-1]]
+            )
+            fluxes.append(np.maximum(spectra - previous, 0).sum(axis=1) / hop)
+            last = spectra[-1]
+
+    if not energies:
+        return AudioFeatures(hop / rate, np.zeros(0), np.zeros(0))
+    return AudioFeatures(hop / rate, np.concatenate(energies), np.concatenate(fluxes))
+
+
+# find the runs of silence at least min_silence seconds long,
+# as (start, end) windows
+def find_silences(
+    features: AudioFeatures,
+    silence_db: float = SILENCE_DB,
+    min_silence: float = MIN_SILENCE,
+) -> np.ndarray:
+    quiet = (features.energy < silence_db).astype(np.int8)
+    edges = np.diff(np.concatenate([[0], quiet, [0]]))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    long = (ends - starts) * features.hop_length >= min_silence
+    return np.stack([starts[long], ends[long]], axis=1)
+
+
+# find the windows where the spectrum changes abruptly compared to the
+# flux around them, ignoring silence
+def find_flux_peaks(
+    features: AudioFeatures,
+    flux_ratio: float = FLUX_RATIO,
+    silence_db: float = SILENCE_DB,
+    window_width: int = FLUX_WINDOW,
+) -> np.ndarray:
+    ratios = get_adaptive_ratios(features.flux, window_width, 0)
+    return np.flatnonzero((ratios >= flux_ratio) & (features.energy >= silence_db))
+
+
+# find the times in seconds where the audio suggests a scene break: the middle
+# of long silences and abrupt changes of the spectrum
+def find_audio_boundaries(
+    features: AudioFeatures,
+    silence_db: float = SILENCE_DB,
+    min_silence: float = MIN_SILENCE,
+    flux_ratio: float = FLUX_RATIO,
+) -> np.ndarray:
+    silences = find_silences(features, silence_db, min_silence)
+    # a silence at the start or the end of the track does not separate anything
+    inner = (silences[:, 0] > 0) & (silences[:, 1] < len(features.energy))
+    middles = silences[inner].mean(axis=1)
+    peaks = find_flux_peaks(features, flux_ratio, silence_db)
+    return np.sort(features.to_seconds(np.concatenate([middles, peaks])))
+
+
+# get the distance of every frame in frames to the nearest of some sorted frames
+def get_distances(frames: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    frames = np.asarray(frames, dtype=np.int64)
+    if len(targets) == 0:
+        return np.full(len(frames), np.iinfo(np.int64).max)
+
+    i = np.searchsorted(targets, frames)
+    after = targets[np.minimum(i, len(targets) - 1)]
+    before = targets[np.maximum(i - 1, 0)]
+    return np.minimum(np.abs(after - frames), np.abs(frames - before))
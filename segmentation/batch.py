@@ -0,0 +1,179 @@
+from __future__ import annotations
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator
+from .segmenter import Segmenter
+from .index_cache import IndexCache
+from .export import get_index_path, load_exported, write_csv, write_json
+from .proxy import make_proxy
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+
+
+# get the wav file next to a video with the same name, None if there is none
+def find_audio(video_path: str) -> str | None:
+    path = os.path.splitext(video_path)[0] + ".wav"
+    return path if os.path.exists(path) else None
+
+
+# find the videos in a list of files and directories
+def find_videos(
+    paths: list[str], recursive: bool = True, extensions: tuple = VIDEO_EXTENSIONS
+) -> list[str]:
+    videos = []
+    for path in paths:
+        if not os.path.isdir(path):
+            videos.append(path)
+            continue
+
+        for root, directories, names in os.walk(path):
+            directories.sort()
+            videos.extend(
+                os.path.join(root, name)
+                for name in sorted(names)
+                if os.path.splitext(name)[1].lower() in extensions
+            )
+            if not recursive:
+                break
+    return videos
+
+
+# result of indexing a video
+class IndexResult:
+    def __init__(
+        self,
+        video_path: str,
+        frame_count: int = 0,
+        elapsed: float = 0.0,  # in seconds
+        counts: list[int] = None,  # number of segments by level
+        outputs: list[str] = None,  # paths of the written indexes
+        cached: bool = False,
+        error: str = None,
+    ) -> None:
+        self.video_path = video_path
+        self.frame_count = frame_count
+        self.elapsed = elapsed
+        self.counts = counts if counts is not None else [0, 0, 0]
+        self.outputs = outputs if outputs is not None else []
+        self.cached = cached
+        self.error = error
+
+    # analyzed frames per second
+    @property
+    def fps(self) -> float:
+        return self.frame_count / self.elapsed if self.elapsed > 0 else 0.0
+
+    # convert to plain data
+    def to_dict(self) -> dict:
+        return {
+            "video": self.video_path,
+            "frame_count": self.frame_count,
+            "elapsed": self.elapsed,
+            "fps": self.fps,
+            "scenes": self.counts[0],
+            "shots": self.counts[1],
+            "subshots": self.counts[2],
+            "outputs": self.outputs,
+            "cached": self.cached,
+            "error": self.error,
+        }
+
+
+# index a video and write it in the given formats, next to the video or to
+# output_dir. the index is also saved to the cache the player reads, and so
+# is a proxy of the video if proxy_size is given. with audio, as in the
+# player, scene cuts are also confirmed by the wav file next to the video if
+# there is one
+def index_video(
+    video_path: str,
+    segmenter: Segmenter,
+    output_dir: str = None,
+    formats: tuple[str, ...] = ("json",),
+    cache: IndexCache = None,
+    proxy_size: tuple[int, int] = None,
+    audio: bool = True,
+) -> IndexResult:
+    result = IndexResult(video_path)
+    try:
+        start = time.perf_counter()
+        audio_path = find_audio(video_path) if audio else None
+        params = segmenter.get_score_params(audio_path)
+        index = cache.load(video_path, params) if cache else None
+        cached = index is not None
+        # or exported by a previous run
+        if index is None:
+            path = get_index_path(video_path, ".json", output_dir)
+            index = load_exported(video_path, params, path)
+        result.cached = index is not None
+        if index is None:
+            thumbnail_path = None
+            if cache:
+                os.makedirs(cache.directory, exist_ok=True)
+                thumbnail_path = cache.get_thumbnail_path(video_path, params)
+            index = segmenter.analyze(
+                video_path, thumbnail_path=thumbnail_path, audio_path=audio_path
+            )
+            if cache:
+                cache.save(video_path, params, index)
+        else:
+            # the index may have been made with other thresholds, cuts found
+            # by the current ones are refined and cached too
+            refined = len(index.refined_cuts)
+            segmenter.build(index, video_path)
+            if cached and len(index.refined_cuts) > refined:
+                cache.save(video_path, params, index)
+        # a cached index reports the time it was analyzed in
+        result.elapsed = index.analysis_time or time.perf_counter() - start
+        result.frame_count = index.frame_count
+        for scene in index.scenes:
+            for segment in scene.walk():
+                result.counts[segment.level] += 1
+
+        for extension in formats:
+            path = get_index_path(video_path, "." + extension, output_dir)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+            if extension == "json":
+                write_json(index, path, video_path, params)
+            elif extension == "csv":
+                write_csv(index, path)
+            else:
+                raise ValueError("unknown index format: " + extension)
+            result.outputs.append(path)
+
+        if proxy_size and cache:
+            path = cache.get_proxy_path(video_path, proxy_size)
+            if not os.path.exists(path):
+                make_proxy(video_path, path, proxy_size)
+                cache.evict(path)
+            result.outputs.append(path)
+    except Exception as e:
+        result.error = str(e)
+    return result
+
+
+# index several videos, jobs of them at once, and yield the results
+# in the order they finish
+def index_videos(
+    video_paths: list[str],
+    segmenter: Segmenter,
+    output_dir: str = None,
+    formats: tuple[str, ...] = ("json",),
+    cache: IndexCache = None,
+    jobs: int = 1,
+    proxy_size: tuple[int, int] = None,
+    audio: bool = True,
+) -> Iterator[IndexResult]:
+    args = (segmenter, output_dir, formats, cache, proxy_size, audio)
+    if jobs <= 1 or len(video_paths) <= 1:
+        for video_path in video_paths:
+            yield index_video(video_path, *args)
+        return
+
+    with ProcessPoolExecutor(min(jobs, len(video_paths))) as pool:
+        futures = [
+            pool.submit(index_video, video_path, *args) for video_path in video_paths
+        ]
+        for future in as_completed(futures):
+            yield future.result()
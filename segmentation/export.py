@@ -0,0 +1,153 @@
+from __future__ import annotations
+import csv
+import json
+import os
+import numpy as np
+from .segment import Segment
+from .video_index import VideoIndex
+from .index_cache import fingerprint, flatten_segments
+
+EXPORT_VERSION = 1
+
+
+# get the path of the index exported next to a video, or to directory
+def get_index_path(
+    video_path: str, extension: str = ".json", directory: str = None
+) -> str:
+    path = os.path.splitext(video_path)[0] + ".index" + extension
+    if directory:
+        return os.path.join(directory, os.path.basename(path))
+    return path
+
+
+# convert a segment and its children to plain data
+def segment_to_dict(index: VideoIndex, segment: Segment) -> dict:
+    return {
+        "level": segment.name,
+        "start": segment.start,
+        "end": segment.end,
+        "start_time": index.to_seconds(segment.start),
+        "end_time": index.to_seconds(segment.end),
+        "children": [segment_to_dict(index, child) for child in segment.children],
+    }
+
+
+# convert plain data made by segment_to_dict back to a segment
+def segment_from_dict(data: dict, level: int = 0) -> Segment:
+    segment = Segment(data["start"], data["end"], level)
+    segment.children = [
+        segment_from_dict(child, level + 1) for child in data["children"]
+    ]
+    return segment
+
+
+# write an index as json, with the scores so it can be rebuilt and the
+# fingerprint of the video and score parameters it was made from
+def write_json(
+    index: VideoIndex, path: str, video_path: str = None, params: tuple = None
+) -> None:
+    data = {
+        "version": EXPORT_VERSION,
+        "video": os.path.basename(video_path) if video_path else None,
+        "fingerprint": fingerprint(video_path) if video_path else None,
+        "params": repr(params) if params is not None else None,
+        "fps": index.fps,
+        "frame_count": index.frame_count,
+        "analysis_time": index.analysis_time,
+        "duration": index.duration,
+        "stride": index.stride,
+        "scenes": [segment_to_dict(index, scene) for scene in index.scenes],
+        "content_vals": index.content_vals.tolist(),
+        "adaptive_ratios": index.adaptive_ratios.tolist(),
+        "refined_cuts": sorted(index.refined_cuts.items()),
+        "refined_ratios": sorted(index.refined_ratios.items()),
+        "keyframes": index.keyframes.tolist(),
+        "keyframe_times": index.keyframe_times.tolist(),
+        "audio_boundaries": index.audio_boundaries.tolist(),
+        "signatures": index.signatures.tolist(),
+    }
+
+    # write to a temporary file first so readers never see a partial file
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as file:
+        json.dump(data, file)
+    os.replace(temp_path, path)
+
+
+# read an index written by write_json
+def read_json(path: str) -> VideoIndex:
+    with open(path) as file:
+        return index_from_dict(json.load(file))
+
+
+# convert the data written by write_json to an index
+def index_from_dict(data: dict) -> VideoIndex:
+    if data.get("version") != EXPORT_VERSION:
+        raise ValueError("unsupported index version: {}".format(data.get("version")))
+
+    index = VideoIndex(
+        data["fps"],
+        np.array(data["content_vals"], dtype=np.float32),
+        np.array(data["adaptive_ratios"], dtype=np.float32),
+        [segment_from_dict(scene) for scene in data["scenes"]],
+        data["stride"],
+        data["frame_count"],
+    )
+    index.analysis_time = data.get("analysis_time", 0.0)
+    index.refined_cuts = {sample: frame for sample, frame in data["refined_cuts"]}
+    index.refined_ratios = {
+        sample: ratio for sample, ratio in data.get("refined_ratios", [])
+    }
+    index.keyframes = np.array(data["keyframes"], dtype=np.int64)
+    index.keyframe_times = np.array(data["keyframe_times"], dtype=np.float64)
+    index.audio_boundaries = np.array(data.get("audio_boundaries", []), dtype=np.int64)
+    if data.get("signatures"):
+        index.signatures = np.array(data["signatures"], dtype=np.uint8)
+    return index
+
+
+# load the index exported to path, next to the video by default, None if
+# there is none made from the same video with the same score parameters
+def load_exported(
+    video_path: str, params: tuple, path: str = None
+) -> VideoIndex | None:
+    path = path or get_index_path(video_path)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path) as file:
+            data = json.load(file)
+        if data.get("fingerprint") != fingerprint(video_path):
+            return None
+        if data.get("params") != repr(params):
+            return None
+        return index_from_dict(data)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+# write the segments of an index as csv, one row per segment. parent is the
+# row of the enclosing segment, -1 for scenes
+def write_csv(index: VideoIndex, path: str) -> None:
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(
+            ["row", "level", "start", "end", "start_time", "end_time", "parent"]
+        )
+        for row, (start, end, level, parent) in enumerate(
+            flatten_segments(index.scenes).tolist()
+        ):
+            writer.writerow(
+                [
+                    row,
+                    Segment(start, end, level).name,
+                    start,
+                    end,
+                    "{:.3f}".format(index.to_seconds(start)),
+                    "{:.3f}".format(index.to_seconds(end)),
+                    parent,
+                ]
+            )
+    os.replace(temp_path, path)
@@ -0,0 +1,204 @@
+from __future__ import annotations
+import hashlib
+import os
+import shutil
+import zipfile
+import numpy as np
+from .segment import Segment
+from .video_index import VideoIndex
+from .thumbnail_atlas import ThumbnailAtlas
+
+CACHE_VERSION = 8
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "csci576-project")
+SAMPLE_SIZE = 1 << 16  # bytes read from each sampled part of a video
+CACHE_EXTENSIONS = (".npz", ".thumbs", ".avi")  # of files owned by the cache
+
+
+# get a fast fingerprint of a file from its size and a few sampled blocks
+def fingerprint(path: str) -> str:
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as file:
+        for offset in (0, size // 2, max(0, size - SAMPLE_SIZE)):
+            file.seek(offset)
+            digest.update(file.read(SAMPLE_SIZE))
+    return digest.hexdigest()
+
+
+# flatten a segment tree into rows of (start, end, level, parent row)
+def flatten_segments(scenes: list[Segment]) -> np.ndarray:
+    rows = []
+
+    def add(segments: list[Segment], parent: int) -> None:
+        for segment in segments:
+            rows.append((segment.start, segment.end, segment.level, parent))
+            add(segment.children, len(rows) - 1)
+
+    add(scenes, -1)
+    return np.array(rows, dtype=np.int64).reshape(-1, 4)
+
+
+# rebuild a segment tree from rows made by flatten_segments
+def unflatten_segments(rows: np.ndarray) -> list[Segment]:
+    scenes = []
+    segments = []
+    for start, end, level, parent in rows.tolist():
+        segment = Segment(start, end, level)
+        segments.append(segment)
+        if parent < 0:
+            scenes.append(segment)
+        else:
+            segments[parent].children.append(segment)
+    return scenes
+
+
+# size-bounded directory of computed video indexes, keyed by video content
+# and segmentation parameters
+class IndexCache:
+    def __init__(
+        self, directory: str = DEFAULT_CACHE_DIR, max_size: int = 4 << 30
+    ) -> None:
+        self.directory = directory
+        self.max_size = max_size  # in bytes
+
+    # get the cache file path of a video for the given parameters
+    def get_path(self, video_path: str, params: tuple) -> str:
+        key = hashlib.blake2b(digest_size=16)
+        key.update(fingerprint(video_path).encode())
+        key.update(repr((CACHE_VERSION, params)).encode())
+        return os.path.join(self.directory, key.hexdigest() + ".npz")
+
+    # get the path of the thumbnail atlas stored with a cached index
+    def get_thumbnail_path(self, video_path: str, params: tuple) -> str:
+        return self.get_path(video_path, params)[: -len(".npz")] + ".thumbs"
+
+    # get the path of the display-resolution proxy of a video
+    def get_proxy_path(self, video_path: str, size: tuple[int, int]) -> str:
+        key = hashlib.blake2b(digest_size=16)
+        key.update(fingerprint(video_path).encode())
+        key.update(repr((CACHE_VERSION, "proxy", tuple(size))).encode())
+        return os.path.join(self.directory, key.hexdigest() + ".avi")
+
+    # load a cached index, None if it does not exist
+    def load(self, video_path: str, params: tuple) -> VideoIndex | None:
+        path = self.get_path(video_path, params)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path) as data:
+                index = VideoIndex(
+                    float(data["fps"]),
+                    data["content_vals"],
+                    data["adaptive_ratios"],
+                    unflatten_segments(data["segments"]),
+                    int(data["stride"]),
+                    int(data["frame_count"]),
+                )
+                index.refined_cuts = dict(data["refined_cuts"].tolist())
+                index.analysis_time = float(data["analysis_time"])
+                index.refined_ratios = {
+                    int(sample): ratio
+                    for sample, ratio in data["refined_ratios"].tolist()
+                }
+                index.keyframes = data["keyframes"]
+                index.keyframe_times = data["keyframe_times"]
+                index.audio_boundaries = data["audio_boundaries"]
+                index.signatures = data["signatures"]
+
+                thumbnail_path = path[: -len(".npz")] + ".thumbs"
+                if len(data["thumbnail_frames"]) and os.path.exists(thumbnail_path):
+                    index.thumbnails = ThumbnailAtlas(
+                        thumbnail_path,
+                        tuple(data["thumbnail_size"].tolist()),
+                        data["thumbnail_frames"].tolist(),
+                    )
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            # corrupted file, drop it
+            os.remove(path)
+            return None
+
+        # mark as recently used
+        os.utime(path)
+        return index
+
+    # save an index to the cache and evict old entries if over the size limit
+    def save(self, video_path: str, params: tuple, index: VideoIndex) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.get_path(video_path, params)
+
+        thumbnails = index.thumbnails
+        thumbnail_frames, thumbnail_size = [], (0, 0)
+        if thumbnails is not None and len(thumbnails):
+            thumbnail_frames, thumbnail_size = thumbnails.frames, thumbnails.size
+            thumbnail_path = self.get_thumbnail_path(video_path, params)
+            if os.path.abspath(thumbnails.path) != os.path.abspath(thumbnail_path):
+                shutil.copyfile(thumbnails.path, thumbnail_path)
+
+        # write to a temporary file first so readers never see a partial file
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as file:
+            np.savez(
+                file,
+                fps=np.float64(index.fps),
+                content_vals=index.content_vals,
+                adaptive_ratios=index.adaptive_ratios,
+                segments=flatten_segments(index.scenes),
+                stride=np.int64(index.stride),
+                frame_count=np.int64(index.frame_count),
+                analysis_time=np.float64(index.analysis_time),
+                refined_cuts=np.array(
+                    sorted(index.refined_cuts.items()), dtype=np.int64
+                ).reshape(-1, 2),
+                refined_ratios=np.array(
+                    sorted(index.refined_ratios.items()), dtype=np.float64
+                ).reshape(-1, 2),
+                keyframes=index.keyframes,
+                keyframe_times=index.keyframe_times,
+                audio_boundaries=index.audio_boundaries,
+                signatures=index.signatures,
+                thumbnail_frames=np.array(thumbnail_frames, dtype=np.int64),
+                thumbnail_size=np.array(thumbnail_size, dtype=np.int64),
+            )
+        os.replace(temp_path, path)
+
+        self.evict()
+
+    # delete the least recently used entries until the cache fits in max_size,
+    # except the entry of the file keep
+    def evict(self, keep: str = None) -> None:
+        if not os.path.isdir(self.directory):
+            return
+
+        # files of an entry share their name, the index file tells its last use
+        entries: dict[str, list] = {}
+        for name in os.listdir(self.directory):
+            key, extension = os.path.splitext(name)
+            # files being written are not entries yet
+            if extension not in CACHE_EXTENSIONS or key.endswith(".tmp"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            entry = entries.setdefault(key, [0.0, 0, []])
+            if extension == ".npz" or not entry[0]:
+                entry[0] = stat.st_mtime
+            entry[1] += stat.st_size
+            entry[2].append(name)
+
+        kept = os.path.splitext(os.path.basename(keep))[0] if keep else None
+        total = sum(entry[1] for entry in entries.values())
+        for key, (_, size, names) in sorted(entries.items(), key=lambda e: e[1][0]):
+            if total <= self.max_size:
+                break
+            if key == kept:
+                continue
+            for name in names:
+                os.remove(os.path.join(self.directory, name))
+            total -= size
+
+    # delete all entries
+    def clear(self) -> None:
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if os.path.splitext(name)[1] in CACHE_EXTENSIONS:
+                os.remove(os.path.join(self.directory, name))
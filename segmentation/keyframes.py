@@ -0,0 +1,26 @@
+import cv2
+import numpy as np
+
+
+# read the frame numbers and timestamps (in ms) of the keyframes of a video by
+# demuxing it without decoding, empty if the backend can't tell keyframes
+def read_keyframes(video_path: str) -> tuple[np.ndarray, np.ndarray]:
+    frames, times = [], []
+    if hasattr(cv2, "CAP_PROP_LRF_HAS_KEY_FRAME"):
+        # a raw stream (format -1) only demuxes packets on grab
+        capture = cv2.VideoCapture(
+            video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1]
+        )
+        try:
+            if capture.isOpened() and capture.get(cv2.CAP_PROP_FORMAT) == -1:
+                frame = 0
+                while capture.grab():
+                    if capture.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                        frames.append(frame)
+                        times.append(capture.get(cv2.CAP_PROP_POS_MSEC))
+                    frame += 1
+        finally:
+            capture.release()
+
+    return np.array(frames, dtype=np.int64), np.array(times, dtype=np.float64)
+
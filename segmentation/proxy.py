@@ -0,0 +1,53 @@
+from __future__ import annotations
+import os
+from typing import Callable
+import cv2
+
+PROXY_API = cv2.CAP_OPENCV_MJPEG  # reads and writes indexed mjpeg avi files
+PROXY_QUALITY = 80  # jpeg quality of proxy frames
+
+
+# transcode a video to an intra-only mjpeg avi of the given size, any frame
+# of it can be decoded without decoding the frames before it
+def make_proxy(
+    video_path: str,
+    path: str,
+    size: tuple[int, int],
+    quality: int = PROXY_QUALITY,
+    on_progress: Callable[[int, int], None] = None,
+    update_interval: int = 30,  # in frames
+) -> None:
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise IOError("cannot open video: " + video_path)
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    # write to a temporary file first so readers never see a partial file
+    temp_path = os.path.splitext(path)[0] + ".tmp.avi"  # the writer needs .avi
+    writer = cv2.VideoWriter(
+        temp_path,
+        PROXY_API,
+        cv2.VideoWriter_fourcc(*"MJPG"),
+        fps,
+        size,
+        [cv2.VIDEOWRITER_PROP_QUALITY, quality],
+    )
+    if not writer.isOpened():
+        capture.release()
+        raise IOError("cannot write proxy: " + temp_path)
+
+    try:
+        count = 0
+        while True:
+            success, frame = capture.read()
+            if not success:
+                break
+            writer.write(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+            count += 1
+            if on_progress and count % update_interval == 0:
+                on_progress(min(count, total), total)
+    finally:
+        writer.release()
+        capture.release()
+    os.replace(temp_path, path)
@@ -0,0 +1,476 @@
+from __future__ import annotations
+import math
+from typing import Iterator
+import cv2
+import numpy as np
+
+# same defaults as scenedetect's AdaptiveDetector and SceneManager
+DEFAULT_MIN_WIDTH = 256
+WINDOW_WIDTH = 2
+MIN_CONTENT_VAL = 15.0
+MIN_SCENE_LEN = 15
+# weights of the hue, saturation, luma and edge deltas in a content value
+DEFAULT_WEIGHTS = (1.0, 1.0, 1.0, 0.0)
+# hue, saturation and value bins of the colour signature of a frame
+SIGNATURE_BINS = (8, 2, 3)
+SIGNATURE_SIZE = SIGNATURE_BINS[0] * SIGNATURE_BINS[1] * SIGNATURE_BINS[2]
+
+
+# get the integer downscale factor used by scenedetect for a frame width
+def get_downscale_factor(frame_width: int, effective_width: int = DEFAULT_MIN_WIDTH) -> int:
+    if frame_width < effective_width:
+        return 1
+    return frame_width // effective_width
+
+
+# get the frame size used for analysis, None to keep the original size. frames
+# are scaled to analysis_width if given, else downscaled like scenedetect does
+def get_analysis_size(
+    frame_width: int, frame_height: int, analysis_width: int = None
+) -> tuple[int, int] | None:
+    if analysis_width:
+        if frame_width <= analysis_width:
+            return None
+        return analysis_width, max(1, frame_height * analysis_width // frame_width)
+
+    factor = get_downscale_factor(frame_width)
+    if factor == 1:
+        return None
+    return frame_width // factor, frame_height // factor
+
+
+# estimate the kernel size used to dilate edges, like scenedetect does
+def get_kernel_size(frame_width: int, frame_height: int) -> int:
+    size = 4 + round(math.sqrt(frame_width * frame_height) / 192)
+    if size % 2 == 0:
+        size += 1
+    return size
+
+
+# computes the content value of each frame to the previous one, the weighted
+# mean of the hue, saturation, luma and edge deltas. it is the same metric
+# AdaptiveDetector uses as "content_val", but computed for batches of frames
+class ContentScorer:
+    def __init__(
+        self,
+        size: tuple[int, int] = None,
+        weights: tuple[float, float, float, float] = DEFAULT_WEIGHTS,
+        kernel_size: int = None,
+    ) -> None:
+        self.size = size  # analysis frame size, None to keep the original size
+        self.weights = np.array(weights, dtype=np.float64)
+        self.kernel_size = kernel_size  # None to estimate from the frame size
+
+        self.__last_hsv: np.ndarray = None
+        self.__last_edges: np.ndarray = None
+        self.__kernel: np.ndarray = None
+
+    # forget the previous frame
+    def reset(self) -> None:
+        self.__last_hsv = None
+        self.__last_edges = None
+
+    # get the analysis shape of a frame
+    def get_shape(self, frame: np.ndarray) -> tuple[int, int, int]:
+        if self.size:
+            return self.size[1], self.size[0], 3
+        return frame.shape
+
+    # scale a BGR frame to the analysis size, into out if given
+    def prepare(self, frame: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        if self.size:
+            return cv2.resize(frame, self.size, out, interpolation=cv2.INTER_AREA)
+        if out is None:
+            return frame
+        out[...] = frame
+        return out
+
+    # get the content value of a BGR frame, 0 for the first frame
+    def score(self, frame: np.ndarray) -> float:
+        return float(self.score_batch(self.prepare(frame)[np.newaxis])[0])
+
+    # get the content values of consecutive BGR frames of the analysis size,
+    # the first frame is compared to the last frame of the previous batch.
+    # the colour signatures of the frames are written to signatures if given
+    def score_batch(
+        self, frames: np.ndarray, signatures: np.ndarray = None
+    ) -> np.ndarray:
+        count, height, width = frames.shape[:3]
+        if count == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        # convert the whole batch at once, stacked as one tall image
+        frames = np.ascontiguousarray(frames)
+        hsv = cv2.cvtColor(frames.reshape(-1, width, 3), cv2.COLOR_BGR2HSV)
+        hsv = hsv.reshape(count, height, width, 3)
+        if signatures is not None:
+            signatures[:] = get_signatures(hsv)
+
+        components = np.zeros((count, 4))
+        components[:, :3] = self.__mean_distances(hsv, self.__last_hsv)
+        if self.weights[3] != 0:
+            edges = self.__detect_edges(hsv[..., 2])
+            components[:, 3] = self.__mean_distances(edges, self.__last_edges)
+            self.__last_edges = edges[-1].copy()
+
+        scores = components @ self.weights / np.abs(self.weights).sum()
+        # the very first frame has nothing to compare with
+        if self.__last_hsv is None:
+            scores[0] = 0.0
+        self.__last_hsv = hsv[-1].copy()
+        return scores.astype(np.float32)
+
+    # get the mean absolute difference (per channel) of each frame to the
+    # frame before it, the first frame is compared to last if given
+    @staticmethod
+    def __mean_distances(frames: np.ndarray, last: np.ndarray) -> np.ndarray:
+        count = len(frames)
+        pixels = frames.shape[1] * frames.shape[2]
+        channels = frames.shape[3] if frames.ndim == 4 else 1
+
+        # rows of pixels with the channels of the frames, summed row by row
+        rows = frames.reshape(count, pixels, channels)
+        sums = np.zeros((count, channels))
+        if count > 1:
+            difference = cv2.absdiff(rows[1:], rows[:-1])
+            sums[1:] = cv2.reduce(
+                difference, 1, cv2.REDUCE_SUM, dtype=cv2.CV_64F
+            ).reshape(count - 1, channels)
+        if last is not None:
+            difference = cv2.absdiff(rows[:1], last.reshape(1, pixels, channels))
+            sums[0] = cv2.sumElems(difference)[:channels]
+
+        distances = sums / pixels
+        return distances[:, 0] if frames.ndim == 3 else distances
+
+    # get the dilated canny edges of luma maps, using median based thresholds
+    def __detect_edges(self, lums: np.ndarray) -> np.ndarray:
+        count, height, width = lums.shape
+        if self.__kernel is None:
+            size = self.kernel_size or get_kernel_size(width, height)
+            self.__kernel = np.ones((size, size), np.uint8)
+
+        sigma = 1.0 / 3.0
+        medians = np.median(lums.reshape(count, -1), axis=1)
+        lows = np.maximum(0, (1.0 - sigma) * medians).astype(int)
+        highs = np.minimum(255, (1.0 + sigma) * medians).astype(int)
+
+        edges = np.empty_like(lums)
+        for i in range(count):
+            edges[i] = cv2.dilate(cv2.Canny(lums[i], lows[i], highs[i]), self.__kernel)
+        return edges
+
+
+# get the colour signature of HSV frames: a joint hue, saturation and value
+# histogram, as fractions of 255
+def get_signatures(hsv: np.ndarray) -> np.ndarray:
+    count = len(hsv)
+    hue_bins, saturation_bins, value_bins = SIGNATURE_BINS
+    hue = hsv[..., 0].astype(np.int32) * hue_bins // 180
+    saturation = hsv[..., 1].astype(np.int32) * saturation_bins // 256
+    value = hsv[..., 2].astype(np.int32) * value_bins // 256
+    bins = (hue * saturation_bins + saturation) * value_bins + value
+
+    # one bincount for the whole batch, each frame in its own range of bins
+    bins = bins.reshape(count, -1) + np.arange(count)[:, np.newaxis] * SIGNATURE_SIZE
+    counts = np.bincount(bins.ravel(), minlength=count * SIGNATURE_SIZE)
+    counts = counts.reshape(count, SIGNATURE_SIZE)
+    return np.round(counts * 255 / max(1, bins.shape[1])).astype(np.uint8)
+
+
+# open a video and move it to a frame, decoding from the beginning if the
+# backend cannot seek exactly
+def open_at(video_path: str, frame: int) -> cv2.VideoCapture:
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise IOError("cannot open video: " + video_path)
+
+    if frame > 0:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, frame)
+        if int(capture.get(cv2.CAP_PROP_POS_FRAMES)) != frame:
+            capture.release()
+            capture = cv2.VideoCapture(video_path)
+            for _ in range(frame):
+                if not capture.grab():
+                    break
+    return capture
+
+
+# content values and colour signatures of consecutive samples, with
+# thumbnails of the samples that may start a segment
+class ScoreBatch:
+    def __init__(
+        self,
+        scores: np.ndarray,
+        thumbnails: dict[int, np.ndarray] = None,
+        signatures: np.ndarray = None,
+    ) -> None:
+        self.scores = scores
+        self.thumbnails = thumbnails if thumbnails is not None else {}  # by sample
+        if signatures is None:
+            signatures = np.zeros((len(scores), SIGNATURE_SIZE), dtype=np.uint8)
+        self.signatures = signatures
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    # join consecutive batches
+    @staticmethod
+    def concatenate(batches: list[ScoreBatch]) -> ScoreBatch:
+        if not batches:
+            return ScoreBatch(np.zeros(0, dtype=np.float32))
+        thumbnails = {}
+        for batch in batches:
+            thumbnails.update(batch.thumbnails)
+        return ScoreBatch(
+            np.concatenate([b.scores for b in batches]),
+            thumbnails,
+            np.concatenate([b.signatures for b in batches]),
+        )
+
+
+# score every stride-th frame of a video in [start, end), or to the last frame
+# if end is None, yielding the content values in batches. start has to be a
+# multiple of stride. if thumbnail_size is given, the batches keep RGB
+# thumbnails of the first sample and of samples scoring at least
+# thumbnail_min_score, as only those can start a segment
+def iter_scores(
+    video_path: str,
+    start: int = 0,
+    end: int = None,
+    size: tuple[int, int] = None,
+    batch_size: int = 30,
+    stride: int = 1,
+    weights: tuple[float, float, float, float] = DEFAULT_WEIGHTS,
+    thumbnail_size: tuple[int, int] = None,
+    thumbnail_min_score: float = MIN_CONTENT_VAL,
+) -> Iterator[ScoreBatch]:
+    # also decode the sample before start (the overlap), so the first
+    # sample is compared to the same frame as in a sequential pass
+    first = max(0, start - stride)
+    capture = open_at(video_path, first)
+    scorer = ContentScorer(size, weights)
+    try:
+        frames: np.ndarray = None  # batch of frames of the analysis size
+        count = 0
+        position = first
+        while True:
+            success = end is None or position < end
+            # skipped frames are only grabbed, without being decoded to images
+            while success and position % stride != 0:
+                success = capture.grab()
+                position += 1
+            if success and (end is None or position < end):
+                success, frame = capture.read()
+            else:
+                success = False
+
+            if success:
+                if position < start:
+                    scorer.score(frame)
+                else:
+                    if frames is None:
+                        shape = scorer.get_shape(frame)
+                        frames = np.empty((batch_size, *shape), np.uint8)
+                    scorer.prepare(frame, frames[count])
+                    count += 1
+                position += 1
+
+            if count == batch_size or (count and not success):
+                signatures = np.empty((count, SIGNATURE_SIZE), np.uint8)
+                scores = scorer.score_batch(frames[:count], signatures)
+                first_sample = (position - 1) // stride - (count - 1)
+                thumbnails = {}
+                if thumbnail_size:
+                    for i in np.flatnonzero(scores >= thumbnail_min_score):
+                        thumbnails[int(first_sample + i)] = make_thumbnail(
+                            frames[i], thumbnail_size
+                        )
+                    if first_sample == 0:
+                        thumbnails[0] = make_thumbnail(frames[0], thumbnail_size)
+                yield ScoreBatch(scores, thumbnails, signatures)
+                count = 0
+            if not success:
+                break
+    finally:
+        capture.release()
+
+
+# score the samples of a video in [start, end) at once, for process pools
+def score_range(
+    video_path: str,
+    start: int,
+    end: int = None,
+    size: tuple[int, int] = None,
+    stride: int = 1,
+    weights: tuple[float, float, float, float] = DEFAULT_WEIGHTS,
+    thumbnail_size: tuple[int, int] = None,
+    thumbnail_min_score: float = MIN_CONTENT_VAL,
+) -> ScoreBatch:
+    batches = iter_scores(
+        video_path,
+        start,
+        end,
+        size,
+        256,
+        stride,
+        weights,
+        thumbnail_size,
+        thumbnail_min_score,
+    )
+    return ScoreBatch.concatenate(list(batches))
+
+
+# get an RGB thumbnail of a BGR frame
+def make_thumbnail(frame: np.ndarray, size: tuple[int, int]) -> np.ndarray:
+    thumbnail = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(thumbnail, cv2.COLOR_BGR2RGB)
+
+
+# finds the exact frame of cuts detected between two samples, by decoding
+# only the frames around them at full frame rate
+class CutRefiner:
+    def __init__(
+        self,
+        video_path: str,
+        stride: int,
+        analysis_width: int = None,
+        weights: tuple[float, float, float, float] = DEFAULT_WEIGHTS,
+        min_content_val: float = MIN_CONTENT_VAL,
+    ) -> None:
+        self.video_path = video_path
+        self.stride = stride
+        self.analysis_width = analysis_width
+        self.weights = weights
+        self.min_content_val = min_content_val
+        self.__size: tuple[int, int] = None
+        self.__capture: cv2.VideoCapture = None
+        self.__position = 0  # next frame of the capture
+
+    # get the frame of a cut detected at a sample, which lies after the
+    # previous sample and up to this one, and its adaptive ratio at full frame
+    # rate. the ratio is what it would be with a stride of 1, 0 if the frame
+    # is not a cut at all
+    def refine(self, sample: int) -> tuple[int, float]:
+        frame = sample * self.stride
+        if sample == 0:
+            return frame, 0.0
+
+        # window_width frames are decoded on each side for the ratio. keep
+        # decoding when the next cut is close to the previous one, else seek
+        first = max(0, frame - self.stride - WINDOW_WIDTH)
+        distance = first - self.__position
+        if self.__capture is None or distance < 0 or distance > 8 * self.stride:
+            self.close()
+            self.__capture = open_at(self.video_path, first)
+            self.__position = first
+            self.__size = get_analysis_size(
+                int(self.__capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(self.__capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                self.analysis_width,
+            )
+        while self.__position < first:
+            self.__capture.grab()
+            self.__position += 1
+
+        # content values of the frames after first
+        scorer = ContentScorer(self.__size, self.weights)
+        content_vals = []
+        for position in range(first, frame + WINDOW_WIDTH + 1):
+            success, image = self.__capture.read()
+            if not success:
+                break
+            self.__position += 1
+            score = scorer.score(image)
+            if position > first:
+                content_vals.append(score)
+
+        low = max(frame - self.stride + 1, first + 1) - first - 1
+        high = min(frame - first, len(content_vals))
+        if high <= low:
+            return frame, 0.0
+        best = low + int(np.argmax(content_vals[low:high]))
+
+        # frames near the start or the end of the video have no ratio,
+        # like with a stride of 1
+        ratio = 0.0
+        if content_vals[best] >= self.min_content_val:
+            ratios = get_adaptive_ratios(
+                content_vals, WINDOW_WIDTH, self.min_content_val
+            )
+            ratio = float(ratios[best])
+        return first + 1 + best, ratio
+
+    # release the video
+    def close(self) -> None:
+        if self.__capture:
+            self.__capture.release()
+            self.__capture = None
+
+
+# get the adaptive ratio of every frame: its content value divided by the mean
+# content value of window_width frames on each side
+def get_adaptive_ratios(
+    content_vals: np.ndarray,
+    window_width: int = WINDOW_WIDTH,
+    min_content_val: float = MIN_CONTENT_VAL,
+) -> np.ndarray:
+    content_vals = np.asarray(content_vals, dtype=np.float64)
+    ratios = np.zeros(len(content_vals), dtype=np.float32)
+    window = 2 * window_width + 1
+    if len(content_vals) < window:
+        return ratios
+
+    # sum of each full window, minus the center frame
+    sums = np.convolve(content_vals, np.ones(window), "valid")
+    targets = content_vals[window_width : len(content_vals) - window_width]
+    averages = (sums - targets) / (2 * window_width)
+
+    zero = np.abs(averages) < 0.00001
+    result = np.where(zero, 0.0, targets / np.where(zero, 1.0, averages))
+    result = np.minimum(result, 255.0)
+    result[zero & (targets >= min_content_val)] = 255.0
+
+    ratios[window_width : len(content_vals) - window_width] = result
+    return ratios
+
+
+# find the cut frames in [start, end) for an adaptive threshold
+def find_cuts(
+    content_vals: np.ndarray,
+    adaptive_ratios: np.ndarray,
+    start: int,
+    end: int,
+    threshold: float,
+    min_scene_len: int = MIN_SCENE_LEN,
+    min_content_val: float = MIN_CONTENT_VAL,
+) -> list[int]:
+    start, end = max(0, start), min(end, len(content_vals))
+    candidates = np.flatnonzero(
+        (adaptive_ratios[start + 1 : end] >= threshold)
+        & (content_vals[start + 1 : end] >= min_content_val)
+    )
+
+    cuts = []
+    last_cut = start
+    for frame in candidates + start + 1:
+        if frame - last_cut >= min_scene_len:
+            cuts.append(int(frame))
+            last_cut = frame
+    return cuts
+
+
+# fill ratios[start:end] from content_vals, giving the same values as
+# get_adaptive_ratios over the whole array
+def update_adaptive_ratios(
+    content_vals: np.ndarray,
+    ratios: np.ndarray,
+    start: int,
+    end: int,
+    window_width: int = WINDOW_WIDTH,
+    min_content_val: float = MIN_CONTENT_VAL,
+) -> None:
+    low = max(0, start - window_width)
+    high = min(len(content_vals), end + window_width)
+    part = get_adaptive_ratios(content_vals[low:high], window_width, min_content_val)
+    ratios[start:end] = part[start - low : end - low]
@@ -0,0 +1,30 @@
+from __future__ import annotations
+from typing import Iterator
+
+LEVEL_NAMES = ["scene", "shot", "subshot"]
+
+
+# a segment of the video in frames, from start (inclusive) to end (exclusive)
+class Segment:
+    def __init__(self, start: int, end: int, level: int = 0) -> None:
+        self.start = start
+        self.end = end
+        self.level = level
+        self.children: list[Segment] = []
+
+    @property
+    def name(self) -> str:
+        return LEVEL_NAMES[self.level]
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start
+
+    # iterate over this segment and all its descendants
+    def walk(self) -> Iterator[Segment]:
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def __repr__(self) -> str:
+        return "{}({}, {})".format(self.name, self.start, self.end)
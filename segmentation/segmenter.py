@@ -0,0 +1,560 @@
+from __future__ import annotations
+import itertools
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator
+import cv2
+import numpy as np
+from .segment import Segment
+from .video_index import VideoIndex
+from .keyframes import read_keyframes
+from .thumbnail_atlas import ThumbnailAtlas
+from .index_cache import fingerprint
+from .audio import read_audio_features, find_audio_boundaries, get_distances
+from .scorer import (
+    CutRefiner,
+    ScoreBatch,
+    get_analysis_size,
+    iter_scores,
+    score_range,
+    find_cuts,
+    update_adaptive_ratios,
+    WINDOW_WIDTH,
+    SIGNATURE_SIZE,
+    MIN_SCENE_LEN,
+    MIN_CONTENT_VAL,
+    DEFAULT_WEIGHTS,
+)
+
+
+# decodes a video once and derives the scene, shot and subshot levels
+# from the stored per-frame scores
+class Segmenter:
+    def __init__(
+        self,
+        scene_threshold: float,
+        shot_threshold: float,
+        subshot_threshold: float,
+        min_scene_len: int = MIN_SCENE_LEN,
+        min_content_val: float = MIN_CONTENT_VAL,
+        min_subshot_length: float = 15,  # in seconds
+        workers: int = 1,  # number of processes scoring frames
+        min_chunk_size: int = 900,  # in frames, for parallel scoring
+        analysis_width: int = None,  # None to downscale like scenedetect
+        stride: int = 1,  # analyze only every stride-th frame
+        refine: bool = True,  # find the exact frame of cuts when stride > 1
+        weights: tuple[float, float, float, float] = DEFAULT_WEIGHTS,
+        thumbnail_width: int = 32,
+        audio_tolerance: float = 0.5,  # in seconds, see analyze
+        scene_similarity: float = None,  # to group shots into scenes, see build
+        scene_memory: int = 3,  # number of shots a shot is compared to
+    ) -> None:
+        # numbers are normalized, so 8 and 8.0 give the same params and
+        # find the same cached and exported indexes
+        self.scene_threshold = float(scene_threshold)
+        self.shot_threshold = float(shot_threshold)
+        self.subshot_threshold = float(subshot_threshold)
+        self.min_scene_len = int(min_scene_len)
+        self.min_content_val = float(min_content_val)
+        self.min_subshot_length = float(min_subshot_length)
+        self.workers = workers
+        self.min_chunk_size = min_chunk_size
+        self.analysis_width = int(analysis_width) if analysis_width else None
+        self.stride = max(1, int(stride))
+        self.refine = bool(refine)
+        # of hue, saturation, luma and edge deltas
+        self.weights = tuple(float(weight) for weight in weights)
+        self.thumbnail_width = int(thumbnail_width)
+        self.audio_tolerance = float(audio_tolerance)
+        if scene_similarity is not None:
+            scene_similarity = float(scene_similarity)
+        self.scene_similarity = scene_similarity
+        self.scene_memory = int(scene_memory)
+
+    # parameters that affect the result of analyze
+    @property
+    def params(self) -> tuple:
+        return (
+            self.scene_threshold,
+            self.shot_threshold,
+            self.subshot_threshold,
+            self.min_scene_len,
+            self.min_content_val,
+            self.min_subshot_length,
+            self.analysis_width,
+            self.stride,
+            self.refine,
+            self.weights,
+            self.thumbnail_width,
+            self.audio_tolerance,
+            self.scene_similarity,
+            self.scene_memory,
+        )
+
+    # parameters that affect the scores of an index, but not the thresholds
+    # and the others only build uses, so a retuned index is rebuilt from the
+    # same scores
+    @property
+    def score_params(self) -> tuple:
+        return (
+            self.min_content_val,
+            self.analysis_width,
+            self.stride,
+            self.refine,
+            self.weights,
+            self.thumbnail_width,
+        )
+
+    # parameters that affect the scores of an index with an audio track
+    def get_score_params(self, audio_path: str = None) -> tuple:
+        if not audio_path:
+            return self.score_params
+        return self.score_params + (fingerprint(audio_path),)
+
+    # decode the video and build its index, on_scene is called with every
+    # scene (including its shots and subshots) as soon as it is complete.
+    # thumbnails of the segments are written to thumbnail_path if given.
+    # with the audio track, shot cuts within audio_tolerance of a long silence
+    # or an abrupt change of the audio are also scene cuts. the audio only adds
+    # scene cuts, it never removes one found in the video. in follow mode the
+    # frames appended to the video are analyzed too, each only once, until
+    # none has been appended for idle_timeout seconds
+    def analyze(
+        self,
+        video_path: str,
+        on_progress: Callable[[int, int], None] = None,
+        on_scene: Callable[[VideoIndex, Segment], None] = None,
+        update_interval: int = 30,  # in samples
+        keyframes: tuple[np.ndarray, np.ndarray] = None,  # read if not given
+        thumbnail_path: str = None,
+        audio_path: str = None,  # pcm wav file of the video
+        follow: bool = False,
+        poll_interval: float = 1.0,  # in seconds, between checks for new frames
+        idle_timeout: float = 10.0,  # in seconds
+    ) -> VideoIndex:
+        start_time = time.perf_counter()
+        capture = cv2.VideoCapture(video_path)
+        if not capture.isOpened():
+            raise IOError("cannot open video: " + video_path)
+        fps = capture.get(cv2.CAP_PROP_FPS)
+        total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        size = get_analysis_size(width, height, self.analysis_width)
+        capture.release()
+
+        thumbnail_size = None
+        if thumbnail_path:
+            thumbnail_size = (
+                self.thumbnail_width,
+                max(1, round(self.thumbnail_width * height / max(1, width))),
+            )
+
+        stride = self.stride
+        content_vals = np.zeros(max(-(-total // stride), 1), dtype=np.float32)
+        ratios = np.zeros_like(content_vals)
+        signatures = np.zeros((len(content_vals), SIGNATURE_SIZE), dtype=np.uint8)
+        index = VideoIndex(fps, content_vals[:0], ratios[:0], stride=stride)
+        if keyframes is None:
+            keyframes = read_keyframes(video_path)
+        index.keyframes, index.keyframe_times = keyframes
+        if thumbnail_path:
+            index.thumbnails = ThumbnailAtlas(thumbnail_path, thumbnail_size)
+        if audio_path:
+            # an unreadable track leaves the cuts to the video alone
+            try:
+                times = find_audio_boundaries(read_audio_features(audio_path))
+                index.audio_boundaries = np.round(times * fps).astype(np.int64)
+            except (OSError, EOFError, ValueError, wave.Error):
+                pass
+        thumbnails = {}  # of samples that may start a segment, by sample
+        refiner = self.__make_refiner(video_path)
+
+        count = 0  # number of scored samples
+        final = 0  # number of samples whose adaptive ratio is final
+        scene_start = 0  # in frames
+        if follow:
+            batches = self.__follow_scores(
+                video_path,
+                size,
+                update_interval,
+                thumbnail_size,
+                poll_interval,
+                idle_timeout,
+            )
+        else:
+            batches = self.__iter_scores(
+                video_path, total, size, update_interval, thumbnail_size
+            )
+        try:
+            for batch in itertools.chain(batches, [None]):
+                if batch is not None:
+                    # grow buffers if the frame count was underestimated
+                    if count + len(batch) > len(content_vals):
+                        length = max(count + len(batch), len(content_vals) * 2)
+                        content_vals = np.resize(content_vals, length)
+                        ratios = np.resize(ratios, length)
+                        signatures = np.resize(signatures, (length, SIGNATURE_SIZE))
+                    content_vals[count : count + len(batch)] = batch.scores
+                    signatures[count : count + len(batch)] = batch.signatures
+                    count += len(batch)
+                    thumbnails.update(batch.thumbnails)
+                    # the frame count of a growing video is only an estimate
+                    total = max(total, count * stride)
+
+                # ratios need window_width samples after the target,
+                # except after the last sample
+                end = count if batch is None else max(final, count - WINDOW_WIDTH)
+                update_adaptive_ratios(content_vals[:count], ratios, final, end)
+                final = end
+                index.content_vals = content_vals[:final]
+                index.adaptive_ratios = ratios[:final]
+                index.signatures = signatures[:final]
+                index.frame_count = final * stride
+
+                # emit the scenes closed by new cuts, the shot after the last
+                # cut is complete only at the end
+                cuts = self.__find_cuts(
+                    index, scene_start, final * stride, 0, batch is None, refiner
+                )
+                for cut in cuts:
+                    cut = self.__to_frame(index, cut, refiner)
+                    scene = self.build_scene(index, scene_start, cut, refiner)
+                    self.__store_thumbnails(index, scene, thumbnails)
+                    index.scenes.append(scene)
+                    if on_scene:
+                        on_scene(index, scene)
+                    scene_start = cut
+
+                if on_progress:
+                    on_progress(min(count * stride, max(total, 0)), total)
+
+            # the last sample is followed by up to stride - 1 frames
+            index.frame_count = min(max(total, (count - 1) * stride + 1), count * stride)
+
+            # the last scene exists only if the video has been cut at all
+            if index.scenes:
+                scene = self.build_scene(index, scene_start, index.frame_count, refiner)
+                self.__store_thumbnails(index, scene, thumbnails)
+                index.scenes.append(scene)
+                if on_scene:
+                    on_scene(index, scene)
+        finally:
+            if refiner:
+                refiner.close()
+            if index.thumbnails is not None:
+                index.thumbnails.close()
+
+        index.content_vals = index.content_vals.copy()
+        index.adaptive_ratios = index.adaptive_ratios.copy()
+        index.signatures = index.signatures.copy()
+        index.analysis_time = time.perf_counter() - start_time
+        return index
+
+    # (re)build the hierarchy of an index from its scores, cuts between
+    # samples are refined only if the video is given. with scene_similarity,
+    # scenes are groups of consecutive shots of similar colours instead of
+    # cuts above the scene threshold
+    def build(self, index: VideoIndex, video_path: str = None) -> list[Segment]:
+        refiner = self.__make_refiner(video_path) if video_path else None
+        try:
+            scenes = self.__split(index, 0, index.frame_count, 0, refiner)
+            index.scenes = [
+                self.build_scene(index, s.start, s.end, refiner) for s in scenes
+            ]
+        finally:
+            if refiner:
+                refiner.close()
+        return index.scenes
+
+    # build a scene with its shots and subshots
+    def build_scene(
+        self, index: VideoIndex, start: int, end: int, refiner: CutRefiner = None
+    ) -> Segment:
+        scene = Segment(start, end, 0)
+        scene.children = self.__split(index, start, end, 1, refiner)
+
+        # a scene without cuts still has one shot
+        if not scene.children:
+            scene.children = [Segment(start, end, 1)]
+            return scene
+
+        # only long shots are split into subshots, except the first one
+        for shot in scene.children[1:]:
+            if index.to_seconds(shot.length) > self.min_subshot_length:
+                shot.children = self.__split(index, shot.start, shot.end, 2, refiner)
+        return scene
+
+    # get the threshold of a level
+    def get_threshold(self, level: int) -> float:
+        return [self.scene_threshold, self.shot_threshold, self.subshot_threshold][
+            level
+        ]
+
+    # set the threshold of a level, build derives the levels from it again
+    def set_threshold(self, level: int, value: float) -> None:
+        name = ["scene_threshold", "shot_threshold", "subshot_threshold"][level]
+        setattr(self, name, float(value))
+
+    # score all samples of a video in order, in parallel chunks if there are
+    # several workers
+    def __iter_scores(
+        self,
+        video_path: str,
+        total: int,
+        size: tuple[int, int],
+        batch_size: int,
+        thumbnail_size: tuple[int, int] = None,
+    ) -> Iterator[ScoreBatch]:
+        stride = self.stride
+        if self.workers <= 1 or total < 2 * self.min_chunk_size:
+            yield from iter_scores(
+                video_path,
+                0,
+                None,
+                size,
+                batch_size,
+                stride,
+                self.weights,
+                thumbnail_size,
+                self.min_content_val,
+            )
+            return
+
+        # a few chunks per worker to balance the load, the last one reads to
+        # the end in case the frame count is underestimated. each chunk also
+        # decodes the sample before it, so the stitched scores are exactly the
+        # same as a sequential pass and so are the cuts derived from them
+        chunk_size = max(self.min_chunk_size, -(-total // (self.workers * 4)))
+        chunk_size = -(-chunk_size // stride) * stride
+        starts = list(range(0, total, chunk_size))
+        ends = starts[1:] + [None]
+        # chunks not started yet are cancelled if scoring stops early
+        pool = ProcessPoolExecutor(self.workers)
+        try:
+            yield from pool.map(
+                score_range,
+                itertools.repeat(video_path),
+                starts,
+                ends,
+                itertools.repeat(size),
+                itertools.repeat(stride),
+                itertools.repeat(self.weights),
+                itertools.repeat(thumbnail_size),
+                itertools.repeat(self.min_content_val),
+            )
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    # score the samples of a growing video as frames are appended to it,
+    # reopening it at the first sample not scored yet
+    def __follow_scores(
+        self,
+        video_path: str,
+        size: tuple[int, int],
+        batch_size: int,
+        thumbnail_size: tuple[int, int],
+        poll_interval: float,
+        idle_timeout: float,
+    ) -> Iterator[ScoreBatch]:
+        count = 0  # number of scored samples
+        last_change = time.monotonic()
+        while True:
+            for batch in iter_scores(
+                video_path,
+                count * self.stride,
+                None,
+                size,
+                batch_size,
+                self.stride,
+                self.weights,
+                thumbnail_size,
+                self.min_content_val,
+            ):
+                count += len(batch)
+                last_change = time.monotonic()
+                yield batch
+
+            if time.monotonic() - last_change >= idle_timeout:
+                return
+            time.sleep(poll_interval)
+
+    # add the thumbnails of the segments of a closed scene to the atlas, and
+    # forget the thumbnails before its end
+    def __store_thumbnails(
+        self, index: VideoIndex, scene: Segment, thumbnails: dict[int, np.ndarray]
+    ) -> None:
+        if index.thumbnails is None:
+            return
+
+        for segment in scene.walk():
+            thumbnail = thumbnails.get(index.to_sample(segment.start))
+            if thumbnail is not None:
+                index.thumbnails.add(segment.start, thumbnail)
+
+        end = index.to_sample(scene.end)
+        for sample in [sample for sample in thumbnails if sample < end]:
+            del thumbnails[sample]
+
+    # make a refiner for cuts between samples, None if not needed
+    def __make_refiner(self, video_path: str) -> CutRefiner | None:
+        if self.stride == 1 or not self.refine:
+            return None
+        return CutRefiner(
+            video_path,
+            self.stride,
+            self.analysis_width,
+            self.weights,
+            self.min_content_val,
+        )
+
+    # find the exact frame and ratio of a cut found at a sample, once
+    def __refine(
+        self, index: VideoIndex, sample: int, refiner: CutRefiner = None
+    ) -> None:
+        if refiner and sample not in index.refined_cuts:
+            frame, ratio = refiner.refine(sample)
+            index.refined_cuts[sample] = frame
+            index.refined_ratios[sample] = ratio
+
+    # get the frame of a cut found at a sample
+    def __to_frame(
+        self, index: VideoIndex, sample: int, refiner: CutRefiner = None
+    ) -> int:
+        self.__refine(index, sample, refiner)
+        return index.to_frame(sample)
+
+    # split a frame range into segments, empty if there is no cut in it
+    def __split(
+        self,
+        index: VideoIndex,
+        start: int,
+        end: int,
+        level: int,
+        refiner: CutRefiner = None,
+    ) -> list[Segment]:
+        cuts = [
+            self.__to_frame(index, cut, refiner)
+            for cut in self.__find_cuts(index, start, end, level, refiner=refiner)
+        ]
+        if not cuts:
+            return []
+
+        bounds = [start] + cuts + [end]
+        return [Segment(bounds[i], bounds[i + 1], level) for i in range(len(cuts) + 1)]
+
+    # find the cuts of a level in a frame range, as samples. closed tells
+    # whether the range ends at the end of the video
+    def __find_cuts(
+        self,
+        index: VideoIndex,
+        start: int,
+        end: int,
+        level: int,
+        closed: bool = True,
+        refiner: CutRefiner = None,
+    ) -> list[int]:
+        if level == 0 and self.scene_similarity and len(index.signatures):
+            cuts = self.__group_shots(index, start, end, closed, refiner)
+        else:
+            cuts = self.__find_visual_cuts(index, start, end, level, refiner)
+        if level > 0 or len(index.audio_boundaries) == 0:
+            return cuts
+
+        # shot cuts confirmed by the audio are scene cuts too
+        shots = self.__find_visual_cuts(index, start, end, 1, refiner)
+        shots = np.array(shots, np.int64)
+        distances = get_distances(shots * index.stride, index.audio_boundaries)
+        confirmed = shots[distances <= self.audio_tolerance * index.fps]
+
+        min_length = -(-self.min_scene_len // index.stride)
+        merged = []
+        last_cut = index.to_sample(start)
+        for cut in sorted(set(cuts).union(confirmed.tolist())):
+            if cut - last_cut >= min_length:
+                merged.append(cut)
+                last_cut = cut
+        return merged
+
+    # find the scene cuts in a frame range by grouping its shots: a shot starts
+    # a new scene if its signature is not similar to any of the last
+    # scene_memory shots of the scene. the similarity is the intersection of
+    # the mean signatures of the shots, from 0 to 1
+    def __group_shots(
+        self,
+        index: VideoIndex,
+        start: int,
+        end: int,
+        closed: bool,
+        refiner: CutRefiner = None,
+    ) -> list[int]:
+        shots = self.__find_visual_cuts(index, start, end, 1, refiner)
+        if not shots:
+            return []
+
+        first = index.to_sample(start)
+        last = min(index.to_sample(end), len(index.signatures))
+        sums = np.add.reduceat(
+            index.signatures[first:last].astype(np.float32),
+            np.array([first] + shots) - first,
+        )
+        signatures = sums / np.maximum(sums.sum(axis=1, keepdims=True), 1)
+
+        # the last shot may still grow unless the range is closed
+        count = len(shots) if closed else len(shots) - 1
+        cuts = []
+        scene_first = 0  # first shot of the current scene
+        for shot in range(1, count + 1):
+            recent = signatures[max(scene_first, shot - self.scene_memory) : shot]
+            similarity = np.minimum(recent, signatures[shot]).sum(axis=1).max()
+            if similarity < self.scene_similarity:
+                cuts.append(shots[shot - 1])
+                scene_first = shot
+        return cuts
+
+    # find the cuts of a level in a frame range from the scores only
+    def __find_visual_cuts(
+        self,
+        index: VideoIndex,
+        start: int,
+        end: int,
+        level: int,
+        refiner: CutRefiner = None,
+    ) -> list[int]:
+        threshold = self.get_threshold(level)
+        min_length = -(-self.min_scene_len // index.stride)
+        if index.stride == 1:
+            return find_cuts(
+                index.content_vals,
+                index.adaptive_ratios,
+                index.to_sample(start),
+                index.to_sample(end),
+                threshold,
+                min_length,
+                self.min_content_val,
+            )
+
+        # the content values of samples span stride frames, so on motion the
+        # ratio of a cut is about stride times lower than at full frame rate.
+        # candidates above the scaled threshold are kept if their ratio at
+        # full frame rate, when refined, is above the threshold itself
+        candidates = find_cuts(
+            index.content_vals,
+            index.adaptive_ratios,
+            index.to_sample(start),
+            index.to_sample(end),
+            max(1.0, threshold / index.stride),
+            1,
+            self.min_content_val,
+        )
+        cuts = []
+        last_cut = index.to_sample(start)
+        for cut in candidates:
+            self.__refine(index, cut, refiner)
+            if index.refined_ratios.get(cut, threshold) < threshold:
+                continue
+            if cut - last_cut >= min_length:
+                cuts.append(cut)
+                last_cut = cut
+        return cuts
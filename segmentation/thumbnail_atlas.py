@@ -0,0 +1,64 @@
+from __future__ import annotations
+import os
+import numpy as np
+
+
+# raw file of equally sized RGB thumbnails, one per row, keyed by frame number.
+# it is written once during indexing and memory-mapped for reading, so only
+# the thumbnails that are drawn get loaded
+class ThumbnailAtlas:
+    def __init__(self, path: str, size: tuple[int, int], frames: list[int] = None):
+        self.path = path
+        self.size = size  # (width, height)
+        self.frames: list[int] = list(frames) if frames is not None else []
+        self.__rows = {frame: row for row, frame in enumerate(self.frames)}
+
+        self.__file = None
+        self.__map: np.memmap = None
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __contains__(self, frame: int) -> bool:
+        return frame in self.__rows
+
+    # add the thumbnail of a frame at the end of the file
+    def add(self, frame: int, image: np.ndarray) -> None:
+        if frame in self.__rows:
+            return
+        if self.__file is None:
+            self.__file = open(self.path, "ab" if self.frames else "wb")
+        self.__file.write(np.ascontiguousarray(image, dtype=np.uint8).tobytes())
+        self.__rows[frame] = len(self.frames)
+        self.frames.append(frame)
+
+    # finish writing
+    def close(self) -> None:
+        if self.__file:
+            self.__file.close()
+            self.__file = None
+        self.__map = None
+
+    # get the thumbnail of a frame as a (height, width, 3) array backed by the
+    # file, None if there is none
+    def get(self, frame: int) -> np.ndarray | None:
+        row = self.__rows.get(frame)
+        if row is None:
+            return None
+
+        if self.__map is None or row >= len(self.__map):
+            if self.__file:
+                self.__file.flush()
+            if not os.path.exists(self.path):
+                return None
+            width, height = self.size
+            self.__map = np.memmap(
+                self.path, np.uint8, "r", shape=(len(self.frames), height, width, 3)
+            )
+        return self.__map[row]
+
+    # delete the file
+    def delete(self) -> None:
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,76 @@
+from __future__ import annotations
+import numpy as np
+from .segment import Segment
+from .scorer import get_adaptive_ratios, SIGNATURE_SIZE
+from .thumbnail_atlas import ThumbnailAtlas
+
+
+# per-frame scores of a video and the scene/shot/subshot hierarchy derived from them.
+# scores are stored for every stride-th frame (the samples), segments are in frames
+class VideoIndex:
+    def __init__(
+        self,
+        fps: float,
+        content_vals: np.ndarray,
+        adaptive_ratios: np.ndarray = None,
+        scenes: list[Segment] = None,
+        stride: int = 1,
+        frame_count: int = None,
+    ) -> None:
+        self.fps = fps
+        self.stride = stride
+        self.content_vals = np.asarray(content_vals, dtype=np.float32)
+        if adaptive_ratios is None:
+            adaptive_ratios = get_adaptive_ratios(self.content_vals)
+        self.adaptive_ratios = np.asarray(adaptive_ratios, dtype=np.float32)
+        self.scenes: list[Segment] = scenes if scenes is not None else []
+        self.__frame_count = frame_count
+        self.analysis_time = 0.0  # in seconds, 0 if unknown
+
+        # colour signature of each sample, see scorer.get_signatures
+        self.signatures = np.zeros((0, SIGNATURE_SIZE), dtype=np.uint8)
+
+        # exact frames of cuts found at samples and their adaptive ratios
+        # at full frame rate, when refined
+        self.refined_cuts: dict[int, int] = {}
+        self.refined_ratios: dict[int, float] = {}
+
+        # frame numbers and timestamps (in ms) of keyframes, for seeking
+        self.keyframes = np.zeros(0, dtype=np.int64)
+        self.keyframe_times = np.zeros(0, dtype=np.float64)
+
+        # sorted frames where the audio suggests a scene break
+        self.audio_boundaries = np.zeros(0, dtype=np.int64)
+
+        # thumbnails of the first frame of segments
+        self.thumbnails: ThumbnailAtlas = None
+
+    @property
+    def sample_count(self) -> int:
+        return len(self.content_vals)
+
+    @property
+    def frame_count(self) -> int:
+        if self.__frame_count is not None:
+            return self.__frame_count
+        return self.sample_count * self.stride
+
+    @frame_count.setter
+    def frame_count(self, value: int) -> None:
+        self.__frame_count = value
+
+    @property
+    def duration(self) -> float:
+        return self.frame_count / self.fps if self.fps else 0
+
+    # convert a frame number to seconds
+    def to_seconds(self, frame: int) -> float:
+        return frame / self.fps if self.fps else 0
+
+    # get the sample at or after a frame
+    def to_sample(self, frame: int) -> int:
+        return -(-frame // self.stride)
+
+    # get the frame of a cut found at a sample
+    def to_frame(self, sample: int) -> int:
+        return self.refined_cuts.get(sample, sample * self.stride)
@@ -0,0 +1,210 @@
+from __future__ import annotations
+import multiprocessing
+import os
+import queue
+import signal
+import numpy as np
+from .segmenter import Segmenter
+from .index_cache import IndexCache
+from .keyframes import read_keyframes
+from .export import get_index_path, load_exported
+from .proxy import make_proxy
+
+# event kinds sent from the worker process
+PROGRESS = "progress"  # (done frames, total frames)
+KEYFRAMES = "keyframes"  # (keyframe numbers, keyframe times)
+SCENE = "scene"  # (fps, scene segment, thumbnails by frame)
+DONE = "done"  # video index, its scenes are not sent as scene events if cached
+PROXY = "proxy"  # path of the proxy of the video, sent after done
+ERROR = "error"  # error message
+
+
+# entry of the worker process
+def _run(
+    video_path: str,
+    segmenter: Segmenter,
+    cache: IndexCache,
+    events: multiprocessing.Queue,
+    proxy_size: tuple[int, int] = None,
+    audio_path: str = None,
+    follow: bool = False,
+    index_dir: str = None,
+) -> None:
+    # the process pool of the segmenter joins this process group,
+    # so stopping the worker stops its pool too
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    # a handler inherited from the parent, like the one of SDL, would keep
+    # the process from being terminated
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    try:
+        # a growing video has neither a cached nor an exported index yet
+        params = segmenter.get_score_params(audio_path)
+        index = cache.load(video_path, params) if cache and not follow else None
+        cached = index is not None
+        # an index exported by the batch indexer, next to the video or to
+        # index_dir
+        if index is None and not follow:
+            path = get_index_path(video_path, directory=index_dir)
+            index = load_exported(video_path, params, path)
+        if index is None:
+            # keyframes are read first, they are needed for seeking right away
+            keyframes = read_keyframes(video_path)
+            events.put((KEYFRAMES, keyframes))
+
+            def on_scene(index, scene):
+                # the thumbnails are copied, the atlas is still being written
+                thumbnails = {}
+                if index.thumbnails is not None:
+                    for segment in scene.walk():
+                        thumbnail = index.thumbnails.get(segment.start)
+                        if thumbnail is not None:
+                            thumbnails[segment.start] = np.array(thumbnail)
+                events.put((SCENE, (index.fps, scene, thumbnails)))
+
+            def on_progress(done, total):
+                events.put((PROGRESS, (done, total)))
+
+            thumbnail_path = None
+            if cache:
+                os.makedirs(cache.directory, exist_ok=True)
+                thumbnail_path = cache.get_thumbnail_path(video_path, params)
+            index = segmenter.analyze(
+                video_path,
+                on_progress,
+                on_scene,
+                keyframes=keyframes,
+                thumbnail_path=thumbnail_path,
+                audio_path=audio_path,
+                follow=follow,
+            )
+            # keyframes appended while following
+            if follow:
+                index.keyframes, index.keyframe_times = read_keyframes(video_path)
+                events.put((KEYFRAMES, (index.keyframes, index.keyframe_times)))
+            if cache:
+                cache.save(video_path, params, index)
+        else:
+            events.put((KEYFRAMES, (index.keyframes, index.keyframe_times)))
+            # the index may have been made with other thresholds, cuts found
+            # by the current ones are refined and cached too
+            refined = len(index.refined_cuts)
+            segmenter.build(index, video_path)
+            if cached and len(index.refined_cuts) > refined:
+                cache.save(video_path, params, index)
+
+        events.put((DONE, index))
+
+        # the proxy is made last, the index is more urgent
+        if proxy_size and cache and not follow:
+            path = cache.get_proxy_path(video_path, proxy_size)
+            if os.path.exists(path):
+                os.utime(path)
+            else:
+                make_proxy(video_path, path, proxy_size)
+                cache.evict(path)
+            events.put((PROXY, path))
+    except Exception as e:
+        events.put((ERROR, str(e)))
+
+
+# runs segmentation in a separate process and streams the results back
+class SegmentationWorker:
+    def __init__(
+        self,
+        segmenter: Segmenter,
+        cache: IndexCache = None,
+        proxy_size: tuple[int, int] = None,  # to make proxies of, needs a cache
+        index_dir: str = None,  # of indexes exported elsewhere than the videos
+    ) -> None:
+        self.segmenter = segmenter
+        self.cache = cache
+        self.proxy_size = proxy_size
+        self.index_dir = index_dir
+
+        self.__process: multiprocessing.Process = None
+        self.__events: multiprocessing.Queue = None
+        self.__follow = False
+
+    @property
+    def running(self) -> bool:
+        return self.__process is not None and self.__process.is_alive()
+
+    # whether there may be events to poll, until the last one has been polled
+    @property
+    def busy(self) -> bool:
+        return self.__events is not None
+
+    # start segmenting a video, stopping the previous one if any. scene cuts
+    # are also confirmed by its audio track if given. if follow, frames
+    # appended to the video are segmented as they are written
+    def start(
+        self, video_path: str, audio_path: str = None, follow: bool = False
+    ) -> None:
+        self.stop()
+        self.__follow = follow
+
+        # not a daemon, so the segmenter can start its own process pool,
+        # the process has to be stopped explicitly instead
+        self.__events = multiprocessing.Queue()
+        self.__process = multiprocessing.Process(
+            target=_run,
+            args=(
+                video_path,
+                self.segmenter,
+                self.cache,
+                self.__events,
+                self.proxy_size,
+                audio_path,
+                follow,
+                self.index_dir,
+            ),
+        )
+        self.__process.start()
+
+    # stop the current segmentation
+    def stop(self) -> None:
+        if self.__process:
+            if self.__process.is_alive():
+                self.__kill(self.__process.pid)
+            self.__process.join()
+            self.__process = None
+        if self.__events:
+            self.__events.close()
+            self.__events = None
+
+    # kill the worker process with its process pool, only the worker
+    # process if it is not leading its own process group yet
+    def __kill(self, pid: int) -> None:
+        try:
+            if hasattr(os, "killpg") and os.getpgid(pid) == pid:
+                os.killpg(pid, signal.SIGTERM)
+                return
+        except ProcessLookupError:
+            return
+        self.__process.terminate()
+
+    # get all events sent since the last call, without blocking
+    def poll(self) -> list[tuple[str, object]]:
+        events = []
+        if not self.__events:
+            return events
+
+        while True:
+            try:
+                event = self.__events.get_nowait()
+            except queue.Empty:
+                break
+            events.append(event)
+
+            # the process has nothing more to send
+            last = PROXY if self.proxy_size and self.cache else DONE
+            if self.__follow:
+                last = DONE
+            if event[0] in (last, ERROR):
+                self.__process.join()
+                self.__process = None
+                self.__events.close()
+                self.__events = None
+                break
+        return events
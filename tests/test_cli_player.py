@@ -0,0 +1,75 @@
+import sys
+import segmentation
+import segmentation.__main__ as cli
+from benchmark.synthetic import make_video
+
+
+# the segmenter as the player makes it from the integers in __main__.py
+def make_player_segmenter(
+    scene_threshold: float = 8, shot_threshold: float = 6, subshot_threshold: float = 4
+) -> segmentation.Segmenter:
+    return segmentation.Segmenter(
+        scene_threshold,
+        shot_threshold,
+        subshot_threshold,
+        workers=1,
+        analysis_width=160,
+        stride=1,
+    )
+
+
+# index a video with the batch indexer, with thresholds parsed as floats
+def run_cli(monkeypatch, video_path: str, output_dir: str, cache_dir: str) -> None:
+    monkeypatch.setattr(cli, "IndexCache", lambda: segmentation.IndexCache(cache_dir))
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "segmentation",
+            video_path,
+            "-o",
+            output_dir,
+            "-j",
+            "1",
+            "--scene-threshold",
+            "8",
+            "--shot-threshold",
+            "6",
+            "--subshot-threshold",
+            "4",
+        ],
+    )
+    assert cli.main() == 0
+
+
+def test_cli_index_loads_in_player(tmp_path, monkeypatch):
+    video_path = str(tmp_path / "video.mp4")
+    make_video(video_path, 150, 30, size=(160, 90))
+    output_dir = str(tmp_path / "indexes")
+    cache_dir = str(tmp_path / "cache")
+    run_cli(monkeypatch, video_path, output_dir, cache_dir)
+
+    params = make_player_segmenter().get_score_params(None)
+    path = segmentation.export.get_index_path(video_path, directory=output_dir)
+    exported = segmentation.export.load_exported(video_path, params, path)
+    assert exported is not None
+    cached = segmentation.IndexCache(cache_dir).load(video_path, params)
+    assert cached is not None
+    assert exported.frame_count == cached.frame_count == 150
+
+
+def test_cli_index_loads_with_other_thresholds(tmp_path, monkeypatch):
+    video_path = str(tmp_path / "video.mp4")
+    make_video(video_path, 150, 30, size=(160, 90))
+    output_dir = str(tmp_path / "indexes")
+    cache_dir = str(tmp_path / "cache")
+    run_cli(monkeypatch, video_path, output_dir, cache_dir)
+
+    # the scores do not depend on the thresholds, only the hierarchy does
+    segmenter = make_player_segmenter(1000, 1000, 1000)
+    cached = segmentation.IndexCache(cache_dir).load(
+        video_path, segmenter.get_score_params(None)
+    )
+    assert cached is not None and len(cached.scenes) > 0
+    segmenter.build(cached, video_path)
+    assert len(cached.scenes) == 0
@@ -1,7 +1,13 @@
 from ui.ui_element import UIElement
+from ui.text_renderer import TextRenderer
 from ui.button import Button
 from ui.video_frame import VideoFrame
 from ui.canvas import Canvas
 from ui.text import Text
 from ui.text_input import TextInput
-from ui.scroll_view import ScrollView
\ No newline at end of file
+from ui.scroll_view import ScrollView
+from ui.timeline import Timeline
+from ui.video_decoder import VideoDecoder
+from ui.pcm_audio import PCMAudio
+from ui.profiler import Profiler
+from ui.performance_hud import PerformanceHUD
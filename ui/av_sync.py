@@ -0,0 +1,100 @@
+from __future__ import annotations
+from collections import deque
+import math
+import time
+from typing import Callable
+
+
+# master clock for video playback, driven by the audio playback position.
+# falls back to the wall clock when there is no audio position, e.g. after
+# the audio has ended
+class AVSync:
+    def __init__(
+        self,
+        fps: float,
+        get_audio_position: Callable[[], float | None] = None,  # in seconds
+        max_drop: int = 8,
+        history: int = 300,
+    ) -> None:
+        self.fps = fps
+        self.get_audio_position = get_audio_position  # None if not playing
+        self.max_drop = max_drop  # late frames dropped before skipping by seeking
+
+        self.__anchor_time = 0.0  # clock at the anchor
+        self.__anchor_wall = time.perf_counter()
+        self.__running = False
+
+        self.drifts: deque[float] = deque(maxlen=history)  # in seconds
+        self.shown_frames = 0
+        self.dropped_frames = 0  # decoded but never shown
+        self.skipped_frames = 0  # skipped by seeking, never decoded
+
+    # current playback time in seconds
+    @property
+    def clock(self) -> float:
+        if not self.__running:
+            return self.__anchor_time
+
+        now = time.perf_counter()
+        position = self.get_audio_position() if self.get_audio_position else None
+        if position is not None:
+            self.__anchor_time = position
+            self.__anchor_wall = now
+        return self.__anchor_time + (now - self.__anchor_wall)
+
+    # number of the frame that should be shown now
+    @property
+    def target_frame(self) -> int:
+        return math.floor(self.clock * self.fps)
+
+    # time in seconds the last shown frame was ahead of the clock,
+    # negative if it was late
+    @property
+    def drift(self) -> float:
+        return self.drifts[-1] if self.drifts else 0.0
+
+    # mean absolute drift in seconds over the recent frames
+    @property
+    def mean_drift(self) -> float:
+        if not self.drifts:
+            return 0.0
+        return sum(abs(drift) for drift in self.drifts) / len(self.drifts)
+
+    # max absolute drift in seconds over the recent frames
+    @property
+    def max_drift(self) -> float:
+        return max((abs(drift) for drift in self.drifts), default=0.0)
+
+    # start the clock at a time in seconds
+    def start(self, position: float = 0.0) -> None:
+        self.__anchor_time = position
+        self.__anchor_wall = time.perf_counter()
+        self.__running = True
+
+    # move the clock to a time in seconds
+    def seek(self, position: float) -> None:
+        running = self.__running
+        self.start(position)
+        self.__running = running
+
+    # stop the clock at the current time
+    def pause(self) -> None:
+        self.__anchor_time = self.clock
+        self.__running = False
+
+    # continue the clock from where it was paused
+    def resume(self) -> None:
+        self.__anchor_wall = time.perf_counter()
+        self.__running = True
+
+    # record that a frame has been shown
+    def record(self, number: int) -> None:
+        self.shown_frames += 1
+        self.drifts.append(number / self.fps - self.clock)
+
+    # reset the statistics
+    def reset_stats(self) -> None:
+        self.drifts.clear()
+        self.shown_frames = 0
+        self.dropped_frames = 0
+        self.skipped_frames = 0
@@ -1,4 +1,5 @@
 from .ui_element import *
+from .text_renderer import TextRenderer
 from typing import Callable
 
 
@@ -17,6 +18,7 @@ class Button(UIElement):
         color_normal: str = "#ffffff",
         color_hover: str = "#DADDD8",
         color_pressed: str = "#1C1C1C",
+        icon: pygame.Surface = None,
     ) -> None:
         super().__init__(screen, x, y, width, height, color_normal)
 
@@ -25,22 +27,47 @@ class Button(UIElement):
         self.color_hover = color_hover
         self.color_pressed = color_pressed
 
-        self.text = font.render(button_text, True, "#ffffff")
+        self.__font = font
+        self.__label = button_text
+        self.text = TextRenderer.render(font, button_text, "#ffffff")
+        self.__icon = icon  # drawn on the left of the text
 
         self.__pressed = False
+        self.__color = None  # color of the current state, None if normal
+
+    @property
+    def label(self) -> str:
+        return self.__label
+
+    @label.setter
+    def label(self, value: str) -> None:
+        if value == self.__label:
+            return
+        self.__label = value
+        self.text = TextRenderer.render(self.__font, value, "#ffffff")
+        self.mark_dirty()
+
+    @property
+    def icon(self) -> pygame.Surface:
+        return self.__icon
+
+    @icon.setter
+    def icon(self, value: pygame.Surface) -> None:
+        self.__icon = value
+        self.mark_dirty()
 
     # override
     def _on_update(self) -> None:
+        color = None
+
         # check if mouse is hovering
         mouse_position = pygame.mouse.get_pos()
         if self.visible and self.get_active_area().collidepoint(mouse_position):
-            # fill hover color
-            self._surface.fill(self.color_hover)
+            color = self.color_hover
 
             # check if left mouse is pressed
             if pygame.mouse.get_pressed()[0]:
-                # fill pressed color
-                self._surface.fill(self.color_pressed)
+                color = self.color_pressed
 
                 # call onclick function if the button is not pressed yet
                 if self.on_click and not self.__pressed:
@@ -49,11 +76,28 @@ class Button(UIElement):
             else:
                 self.__pressed = False
 
-        # draw text
+        # redraw only when the state changes
+        if color != self.__color:
+            self.__color = color
+            self.mark_dirty()
+
+    # override
+    def _on_draw(self) -> None:
+        if self.__color:
+            self._surface.fill(self.__color)
+
+        # draw icon and text
+        text_left = 0
+        if self.icon:
+            icon_rect = self.icon.get_rect()
+            self._surface.blit(
+                self.icon, [1, self.height / 2 - icon_rect.height / 2]
+            )
+            text_left = icon_rect.width + 1
         self._surface.blit(
             self.text,
             [
-                self.width / 2 - self.text.get_rect().width / 2,
+                text_left + (self.width - text_left) / 2 - self.text.get_rect().width / 2,
                 self.height / 2 - self.text.get_rect().height / 2,
             ],
         )
@@ -0,0 +1,225 @@
+from __future__ import annotations
+import struct
+import time
+import numpy as np
+import pygame
+
+MEMORY_MAP_SIZE = 64 << 20  # wav data larger than this is memory-mapped
+PCM = 1  # wav formats
+IEEE_FLOAT = 3
+
+
+# read the format and the position of the samples of a pcm or float wav file,
+# returns (sample rate, channels, sample width in bytes, whether the samples
+# are floats, data offset, data size)
+def read_wav_header(path: str) -> tuple[int, int, int, bool, int, int]:
+    with open(path, "rb") as file:
+        header = file.read(12)
+        if len(header) < 12:
+            raise ValueError("not a wav file: " + path)
+        riff, _, wave = struct.unpack("<4sI4s", header)
+        if riff != b"RIFF" or wave != b"WAVE":
+            raise ValueError("not a wav file: " + path)
+
+        header = None
+        while True:
+            chunk = file.read(8)
+            if len(chunk) < 8:
+                raise ValueError("no audio data in wav file: " + path)
+            chunk_id, size = struct.unpack("<4sI", chunk)
+            if chunk_id == b"fmt ":
+                data = file.read(size)
+                if len(data) < 16:
+                    raise ValueError("bad format in wav file: " + path)
+                audio_format, channels, rate, _, _, bits = struct.unpack(
+                    "<HHIIHH", data[:16]
+                )
+                # extensible formats keep the actual format in the sub format
+                if audio_format == 0xFFFE and len(data) >= 26:
+                    audio_format = struct.unpack("<H", data[24:26])[0]
+                if audio_format not in (PCM, IEEE_FLOAT):
+                    raise ValueError(
+                        "only pcm and float wav files are supported: " + path
+                    )
+                header = (rate, channels, bits // 8, audio_format == IEEE_FLOAT)
+            elif chunk_id == b"data":
+                if header is None:
+                    raise ValueError("no format before audio data: " + path)
+                return (*header, file.tell(), size)
+            else:
+                file.seek(size + size % 2, 1)  # chunks are word aligned
+
+
+# plays a wav file from a pcm buffer loaded once, optionally memory-mapped.
+# the samples are streamed to a mixer channel in short chunks, so playing
+# from any sample needs neither reopening nor decoding the file
+class PCMAudio:
+    def __init__(self, chunk_length: float = 0.5) -> None:
+        self.chunk_length = chunk_length  # in seconds
+
+        self.__samples: np.ndarray = None  # (frames, channels) int16
+        self.__rate = 0
+        self.__channel: pygame.mixer.Channel = None
+        self.__playing = False
+        self.__position = 0  # sample to play from while not playing
+        self.__next_sample = 0  # first sample not queued yet
+        self.__anchor_sample = 0  # sample that started playing at anchor time
+        self.__anchor_time = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self.__samples is not None
+
+    @property
+    def playing(self) -> bool:
+        return self.__playing
+
+    @property
+    def sample_rate(self) -> int:
+        return self.__rate
+
+    # duration in seconds
+    @property
+    def duration(self) -> float:
+        return len(self.__samples) / self.__rate if self.loaded else 0.0
+
+    # number of the sample being played
+    @property
+    def sample_position(self) -> int:
+        if not self.__playing:
+            return self.__position
+        elapsed = round((time.perf_counter() - self.__anchor_time) * self.__rate)
+        return min(self.__anchor_sample + elapsed, self.__next_sample)
+
+    # load a wav file, memory-mapped if memory_map or if it is large
+    def load(self, path: str, memory_map: bool = None) -> None:
+        self.close()
+        rate, channels, width, is_float, offset, size = read_wav_header(path)
+        size -= size % (channels * width)
+        if memory_map is None:
+            memory_map = size > MEMORY_MAP_SIZE
+
+        if is_float:
+            dtype = {4: np.float32, 8: np.float64}.get(width)
+        else:
+            dtype = {1: np.uint8, 2: np.int16, 3: np.uint8, 4: np.int32}.get(width)
+        if dtype is None:
+            raise ValueError("unsupported sample width: {}".format(width))
+
+        if width == 2 and not is_float and memory_map:
+            samples = np.memmap(path, np.int16, "r", offset, (size // 2,))
+        else:
+            samples = np.fromfile(
+                path, dtype, size // np.dtype(dtype).itemsize, offset=offset
+            )
+            # convert to 16 bit, 8 bit samples are unsigned and 24 bit ones
+            # are widened to 32 bit first
+            if is_float:
+                samples = np.clip(samples, -1, 1) * 32767
+                samples = samples.astype(np.int16)
+            elif width == 1:
+                samples = ((samples.astype(np.int16) - 128) << 8).astype(np.int16)
+            elif width == 3:
+                wide = np.zeros((len(samples) // 3, 4), np.uint8)
+                wide[:, 1:] = samples.reshape(-1, 3)
+                samples = (wide.view("<i4").ravel() >> 16).astype(np.int16)
+            elif width == 4:
+                samples = (samples >> 16).astype(np.int16)
+        self.__samples = samples.reshape(-1, channels)
+        self.__rate = rate
+
+        # the mixer plays the samples as they are
+        if pygame.mixer.get_init() != (rate, -16, channels):
+            pygame.mixer.quit()
+            pygame.mixer.init(rate, -16, channels)
+        pygame.mixer.set_reserved(1)
+        self.__channel = pygame.mixer.Channel(0)
+
+    # release the loaded file
+    def close(self) -> None:
+        self.stop()
+        self.__samples = None
+        self.__rate = 0
+        self.__channel = None
+
+    # play from a time in seconds, or from the current position
+    def play(self, start: float = None) -> None:
+        if not self.loaded:
+            return
+        if start is not None:
+            self.__position = self.__to_sample(start)
+        if self.__position >= len(self.__samples):
+            self.__playing = False
+            return
+
+        self.__channel.stop()
+        self.__next_sample = self.__position
+        self.__channel.play(self.__make_chunk())
+        self.__anchor_sample = self.__position
+        self.__anchor_time = time.perf_counter()
+        self.__playing = True
+        self.update()
+
+    # pause at the current sample
+    def pause(self) -> None:
+        if not self.__playing:
+            return
+        self.__position = self.sample_position
+        self.__playing = False
+        self.__channel.stop()
+
+    # stop and move to the beginning
+    def stop(self) -> None:
+        self.pause()
+        self.__position = 0
+
+    # move to a time in seconds, keeping playing if playing
+    def seek(self, position: float) -> None:
+        if self.__playing:
+            self.play(position)
+        else:
+            self.__position = self.__to_sample(position)
+
+    # time of the sample being played in seconds, None if not playing
+    def get_position(self) -> float | None:
+        if not self.__playing:
+            return None
+        return self.sample_position / self.__rate
+
+    # keep a chunk queued after the playing one, called once per frame
+    def update(self) -> None:
+        if not self.__playing:
+            return
+
+        # the channel ran dry: at the end or the updates were too late. it is
+        # briefly not busy while a queued chunk starts, so it is only dry once
+        # all queued samples should have been played
+        elapsed = round((time.perf_counter() - self.__anchor_time) * self.__rate)
+        if (
+            not self.__channel.get_busy()
+            and self.__channel.get_queue() is None
+            and self.__anchor_sample + elapsed >= self.__next_sample
+        ):
+            position = self.__next_sample
+            if position >= len(self.__samples):
+                self.__position = len(self.__samples)
+                self.__playing = False
+            else:
+                self.play(position / self.__rate)
+            return
+
+        if self.__channel.get_queue() is None and self.__next_sample < len(
+            self.__samples
+        ):
+            self.__channel.queue(self.__make_chunk())
+
+    # make a sound of the next chunk of samples
+    def __make_chunk(self) -> pygame.mixer.Sound:
+        start = self.__next_sample
+        end = min(start + round(self.chunk_length * self.__rate), len(self.__samples))
+        self.__next_sample = end
+        return pygame.mixer.Sound(buffer=np.ascontiguousarray(self.__samples[start:end]))
+
+    # convert a time in seconds to a sample number
+    def __to_sample(self, position: float) -> int:
+        return max(0, min(round(position * self.__rate), len(self.__samples)))
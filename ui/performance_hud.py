@@ -0,0 +1,61 @@
+from .ui_element import *
+from .profiler import Profiler
+
+
+# overlay showing rolling percentiles of the profiled stages in ms
+class PerformanceHUD(UIElement):
+    def __init__(
+        self,
+        screen: pygame.Surface,
+        x: int,
+        y: int,
+        profiler: Profiler,
+        font: pygame.font.Font,
+        refresh_interval: float = 0.5,  # in seconds
+        text_color: str = "#ffffff",
+        background_color: str = "#000000",
+    ) -> None:
+        super().__init__(screen, x, y, 1, 1, background_color)
+        self.profiler = profiler
+        self.font = font
+        self.refresh_interval = refresh_interval
+        self.text_color = text_color
+
+        self.__lines: list[pygame.Surface] = []
+        self.__last_refresh = 0
+
+    # override
+    def _on_update(self) -> None:
+        if not self.visible:
+            return
+
+        # only refresh every interval, the text would be unreadable otherwise
+        now = pygame.time.get_ticks()
+        if now - self.__last_refresh < self.refresh_interval * 1000:
+            return
+        self.__last_refresh = now
+
+        texts = ["{:<20}{:>8}{:>8}{:>8}".format("stage (ms)", "p50", "p95", "p99")]
+        for stage in sorted(self.profiler.stages):
+            values = self.profiler.get_percentiles(stage)
+            texts.append(
+                "{:<20}{:>8.2f}{:>8.2f}{:>8.2f}".format(
+                    stage, *[value * 1000 for value in values]
+                )
+            )
+
+        # hud texts change constantly, they are not worth caching
+        self.__lines = [self.font.render(text, True, self.text_color) for text in texts]
+        line_height = self.font.get_linesize()
+        width = max(line.get_width() for line in self.__lines) + 10
+        height = line_height * len(self.__lines) + 10
+        if (width, height) != (self.width, self.height):
+            self.width = width
+            self.height = height
+        self.mark_dirty()
+
+    # override
+    def _on_draw(self) -> None:
+        line_height = self.font.get_linesize()
+        for i, line in enumerate(self.__lines):
+            self._surface.blit(line, (5, 5 + i * line_height))
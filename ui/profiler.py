@@ -0,0 +1,95 @@
+from __future__ import annotations
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator
+import numpy as np
+
+
+# collects the time spent in named stages of each frame, keeps the recent
+# ones for percentiles and optionally writes every frame to a trace file.
+# stages may be measured from any thread, they count for the current frame
+class Profiler:
+    def __init__(self, history: int = 300) -> None:
+        self.history = history  # number of recent samples kept per stage
+        self.frame_number = 0
+
+        self.__samples: dict[str, deque[float]] = {}  # in seconds
+        self.__frame: dict[str, float] = {}  # stages of the current frame
+        self.__frame_start = time.perf_counter()
+        self.__lock = threading.Lock()
+        self.__trace = None  # file of the trace, one json object per line
+
+    # names of the measured stages
+    @property
+    def stages(self) -> list[str]:
+        with self.__lock:
+            return list(self.__samples)
+
+    @property
+    def tracing(self) -> bool:
+        return self.__trace is not None
+
+    # measure the time spent in a block as a stage of the current frame
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    # add time in seconds to a stage of the current frame
+    def add(self, stage: str, seconds: float) -> None:
+        with self.__lock:
+            self.__frame[stage] = self.__frame.get(stage, 0.0) + seconds
+
+    # start a new frame
+    def begin_frame(self) -> None:
+        self.__frame_start = time.perf_counter()
+
+    # finish the current frame, its total time is the "frame" stage
+    def end_frame(self) -> None:
+        end = time.perf_counter()
+        with self.__lock:
+            frame, self.__frame = self.__frame, {}
+            frame["frame"] = end - self.__frame_start
+            for stage, seconds in frame.items():
+                samples = self.__samples.get(stage)
+                if samples is None:
+                    samples = deque(maxlen=self.history)
+                    self.__samples[stage] = samples
+                samples.append(seconds)
+
+        if self.__trace:
+            record = {"frame": self.frame_number, "time": end, "stages": frame}
+            self.__trace.write(json.dumps(record) + "\n")
+        self.frame_number += 1
+
+    # get percentiles of the recent samples of a stage in seconds
+    def get_percentiles(
+        self, stage: str, percentiles: tuple[float, ...] = (50, 95, 99)
+    ) -> list[float]:
+        with self.__lock:
+            samples = list(self.__samples.get(stage, ()))
+        if not samples:
+            return [0.0] * len(percentiles)
+        return np.percentile(samples, percentiles).tolist()
+
+    # write every following frame to a file as json lines
+    def start_trace(self, path: str) -> None:
+        self.stop_trace()
+        self.__trace = open(path, "w")
+
+    # stop writing frames to the trace file
+    def stop_trace(self) -> None:
+        if self.__trace:
+            self.__trace.close()
+            self.__trace = None
+
+    # forget the recent samples
+    def reset(self) -> None:
+        with self.__lock:
+            self.__samples.clear()
@@ -1,4 +1,5 @@
 from .ui_element import *
+from typing import Any, Callable
 
 
 # vertical content view for ScrollView
@@ -16,6 +17,37 @@ class ContentView(UIElement):
         self.__current_position = 0  # viewport current position
         self.__last_position = 0  # position of the last content element
 
+        # list mode: rows are plain data shown by a pool of recycled elements
+        self.__rows: list = None
+        self.__row_height = 0
+        self.__padding = 0  # space above the first row
+        self.__make_row: Callable[[], UIElement] = None
+        self.__bind_row: Callable[[UIElement, Any], None] = None
+        self.__pool: list[UIElement] = []
+        self.__bound: list[int] = []  # row shown by each pooled element
+
+    # show rows of plain data instead of child elements, only the visible rows
+    # get an element made by make_row, and bind_row updates it to a row
+    def set_row_factory(
+        self,
+        row_height: int,
+        make_row: Callable[[], UIElement],
+        bind_row: Callable[[UIElement, Any], None],
+        padding: int = 0,
+    ) -> None:
+        self.clear()
+        self.__rows = []
+        self.__row_height = row_height
+        self.__padding = padding
+        self.__make_row = make_row
+        self.__bind_row = bind_row
+
+    # add rows to the end of the list
+    def add_rows(self, rows: list) -> None:
+        self.__rows.extend(rows)
+        self.__last_position = self.__padding + len(self.__rows) * self.__row_height
+        self.__layout_rows()
+
     # move content vertically
     def move(self, step: int) -> None:
         previous_position = self.__current_position
@@ -27,6 +59,11 @@ class ContentView(UIElement):
             self.__current_position, self.__last_position - self.height
         )
 
+        # in list mode only the visible rows are placed
+        if self.__rows is not None:
+            self.__layout_rows()
+            return
+
         # update content position
         step = previous_position - self.__current_position
         for child in self._children:
@@ -42,18 +79,53 @@ class ContentView(UIElement):
     def get_length(self) -> int:
         return self.__last_position
 
-    # clear all content elements
+    # clear all content elements, pooled rows are kept to be reused
     def clear(self) -> None:
-        self.delete_all_children()
+        if self.__rows is not None:
+            self.__rows = []
+            self.__bound = [-1] * len(self.__pool)
+            for element in self.__pool:
+                element.visible = False
+        else:
+            self.delete_all_children()
         self.__current_position = 0
         self.__last_position = 0
 
+    # place the pooled elements on the visible rows, an element is rebound
+    # only when the row it shows changes
+    def __layout_rows(self) -> None:
+        count = -(-self.height // self.__row_height) + 1
+        while len(self.__pool) < count:
+            element = self.__make_row()
+            element.visible = False
+            element.parent = self
+            self.__pool.append(element)
+            self.__bound.append(-1)
+
+        position = self.__current_position - self.__padding
+        first = max(0, int(position // self.__row_height))
+        for index in range(first, first + count):
+            slot = index % count
+            element = self.__pool[slot]
+            if index >= len(self.__rows):
+                element.visible = False
+                continue
+
+            if self.__bound[slot] != index:
+                self.__bind_row(element, self.__rows[index])
+                self.__bound[slot] = index
+            element.y = index * self.__row_height - position
+            element.visible = True
+
     # override
     def _on_update(self) -> None:
         return
 
     # override
     def _on_child_added(self) -> None:
+        if self.__rows is not None:
+            return
+
         child = self._children[-1]
         # update the last position
         self.__last_position = max(self.__last_position, child.y + child.height)
@@ -83,6 +155,7 @@ class ScrollBar(UIElement):
         self.color_dragging = color_pressed
 
         self.__dragging = False
+        self.__color = None  # color of the current state, None if normal
 
     @property
     def dragging(self) -> bool:
@@ -90,27 +163,37 @@ class ScrollBar(UIElement):
 
     # override
     def _on_update(self) -> None:
+        self.__set_color(self.__get_color())
+
+    # override
+    def _on_draw(self) -> None:
+        if self.__color:
+            self._surface.fill(self.__color)
+
+    # update the dragging state and get the color of it
+    def __get_color(self) -> str:
         mouse_position = pygame.mouse.get_pos()
 
         # if the bar is being dragged
         if self.__dragging and pygame.mouse.get_pressed()[0]:
-            # fill dragging color
-            self._surface.fill(self.color_dragging)
-            return
+            return self.color_dragging
 
         self.__dragging = False
         # check if mouse is hovering
         if self.visible and self.get_active_area().collidepoint(mouse_position):
-            # fill hover color
-            self._surface.fill(self.color_hover)
-
             # check if left mouse is pressed
             if pygame.mouse.get_pressed()[0]:
-                # fill pressed color
-                self._surface.fill(self.color_dragging)
-
                 # start dragging
                 self.__dragging = True
+                return self.color_dragging
+            return self.color_hover
+        return None
+
+    # set the color of the current state, redraw only when it changes
+    def __set_color(self, color: str) -> None:
+        if color != self.__color:
+            self.__color = color
+            self.mark_dirty()
 
 
 # vertical scroll view
@@ -146,11 +229,34 @@ class ScrollView(UIElement):
 
         self.__previous_mouse_position = 0  # for calculating mouse delta position
 
+    # whether the scroll bar is being dragged
+    @property
+    def dragging(self) -> bool:
+        return self.__scroll_bar.dragging
+
     # add a UI element to the content
     def add_to_content(self, element: UIElement) -> None:
         element.parent = self.__content
+        self.__update_bar_size()
+
+    # show rows of plain data instead of elements, see ContentView
+    def set_row_factory(
+        self,
+        row_height: int,
+        make_row: Callable[[], UIElement],
+        bind_row: Callable[[UIElement, Any], None],
+        padding: int = 0,
+    ) -> None:
+        self.__content.set_row_factory(row_height, make_row, bind_row, padding)
+        self.clear_content()
+
+    # add rows of plain data to the content
+    def add_rows(self, rows: list) -> None:
+        self.__content.add_rows(rows)
+        self.__update_bar_size()
 
-        # update bar size
+    # update bar size to the length of the content
+    def __update_bar_size(self) -> None:
         self.__scroll_bar.height = (
             self.height / self.__content.get_length() * self.height
         )
@@ -1,4 +1,5 @@
 from .ui_element import *
+from .text_renderer import TextRenderer
 
 
 class Text(UIElement):
@@ -12,10 +13,13 @@ class Text(UIElement):
         text_color: str = "#ffffff",
         background_color: str = None,
     ) -> None:
-        super().__init__(screen, x, y, 80, 20, background_color)
+        # the background is rendered with the text instead of filled
+        super().__init__(screen, x, y, 80, 20)
         self.__font = font
         self.__text = text
         self.text_color = text_color
+        self.__background_color = background_color
+        self.__refresh_style()
 
     @property
     def text(self) -> str:
@@ -23,6 +27,8 @@ class Text(UIElement):
 
     @text.setter
     def text(self, value) -> None:
+        if value == self.__text:
+            return
         self.__text = value
         self.__refresh_style()
 
@@ -37,11 +43,10 @@ class Text(UIElement):
 
     # refresh text style
     def __refresh_style(self) -> None:
-        self._surface = self.font.render(
-            self.__text, True, self.text_color, self.background_color
+        surface = TextRenderer.render(
+            self.font, self.__text, self.text_color, self.__background_color
         )
-        self._width, self._height = self._surface.get_size()
-        self._rect = pygame.Rect(0, 0, self._width, self._height)
+        self._set_size(*surface.get_size(), surface)
 
     # override
     def _on_update(self) -> None:
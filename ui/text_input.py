@@ -1,7 +1,10 @@
 from .ui_element import *
+from .text_renderer import TextRenderer
+from typing import Callable
 
 
-# TODO
+# single-line text field, focused by clicking it. the text is submitted with
+# enter or when the focus is lost, escape restores the last submitted text
 class TextInput(UIElement):
     def __init__(
         self,
@@ -10,8 +13,108 @@ class TextInput(UIElement):
         y: int,
         width: int,
         height: int,
+        font: pygame.font.Font,
+        text: str = "",
+        on_submit: Callable[[str], None] = None,
+        text_color: str = "#ffffff",
+        color_normal: str = "#50555e",
+        color_focused: str = "#7a8291",
+        max_length: int = 32,
     ) -> None:
-        pass
+        super().__init__(screen, x, y, width, height, color_normal)
+        self.on_submit = on_submit
+        self.text_color = text_color
+        self.color_focused = color_focused
+        self.max_length = max_length
 
+        self.__font = font
+        self.__text = text
+        self.__submitted = text  # text when last submitted
+        self.__focused = False
+        self.__pressed = False  # whether the mouse was pressed on the last update
+
+    @property
+    def text(self) -> str:
+        return self.__text
+
+    # set the text, as if it was submitted
+    @text.setter
+    def text(self, value: str) -> None:
+        self.__submitted = value
+        self.__set_text(value)
+
+    @property
+    def focused(self) -> bool:
+        return self.__focused
+
+    # handle a keyboard event, returns whether it was used. all typing keys
+    # are used while focused, so they do not trigger shortcuts
+    def handle_event(self, event: pygame.event.Event) -> bool:
+        if not self.__focused:
+            return False
+
+        if event.type == pygame.TEXTINPUT:
+            text = (self.__text + event.text)[: self.max_length]
+            self.__set_text(text)
+            return True
+        if event.type != pygame.KEYDOWN:
+            return False
+
+        if event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
+            self.__set_focused(False)
+        elif event.key == pygame.K_ESCAPE:
+            self.__set_text(self.__submitted)
+            self.__set_focused(False)
+        elif event.key == pygame.K_BACKSPACE:
+            self.__set_text(self.__text[:-1])
+        else:
+            return bool(event.unicode)
+        return True
+
+    # set the shown text, redraw only when it changes
+    def __set_text(self, value: str) -> None:
+        if value != self.__text:
+            self.__text = value
+            self.mark_dirty()
+
+    # focus or unfocus, the text is submitted when unfocused
+    def __set_focused(self, value: bool) -> None:
+        if value == self.__focused:
+            return
+        self.__focused = value
+        self.mark_dirty()
+
+        if not value and self.__text != self.__submitted:
+            self.__submitted = self.__text
+            if self.on_submit:
+                self.on_submit(self.__text)
+
+    # override
     def _on_update(self) -> None:
-        pass
\ No newline at end of file
+        # a click focuses when on the field and unfocuses anywhere else
+        pressed = pygame.mouse.get_pressed()[0]
+        if pressed and not self.__pressed:
+            mouse_position = pygame.mouse.get_pos()
+            self.__set_focused(
+                self.visible and self.get_active_area().collidepoint(mouse_position)
+            )
+        self.__pressed = pressed
+
+    # override
+    def _on_draw(self) -> None:
+        if self.__focused:
+            self._surface.fill(self.color_focused)
+
+        text = TextRenderer.render(self.__font, self.__text, self.text_color)
+        top = self.height / 2 - text.get_height() / 2
+        self._surface.blit(text, [5, top])
+
+        # caret after the text
+        if self.__focused:
+            left = min(5 + text.get_width() + 1, self.width - 2)
+            pygame.draw.line(
+                self._surface,
+                self.text_color,
+                (left, top),
+                (left, top + text.get_height()),
+            )
@@ -0,0 +1,46 @@
+from __future__ import annotations
+from collections import OrderedDict
+import pygame
+
+
+# process-wide registry of fonts and cache of rendered text surfaces.
+# cached surfaces are shared, so they must not be drawn on
+class TextRenderer:
+    fonts: dict[tuple[str, int], pygame.font.Font] = {}  # by name and size
+    surfaces: OrderedDict[tuple, pygame.Surface] = OrderedDict()  # by recent use
+    max_surfaces: int = 512  # number of rendered texts kept
+
+    # get a font by name and size, loading it only once
+    @staticmethod
+    def get_font(name: str = None, size: int = 24) -> pygame.font.Font:
+        font = TextRenderer.fonts.get((name, size))
+        if font is None:
+            font = pygame.font.SysFont(name, size)
+            TextRenderer.fonts[(name, size)] = font
+        return font
+
+    # render an antialiased text, reusing the surface if it was rendered before
+    @staticmethod
+    def render(
+        font: pygame.font.Font,
+        text: str,
+        color: str,
+        background_color: str = None,
+    ) -> pygame.Surface:
+        key = (font, text, color, background_color)
+        surfaces = TextRenderer.surfaces
+        surface = surfaces.get(key)
+        if surface is not None:
+            surfaces.move_to_end(key)
+            return surface
+
+        surface = font.render(text, True, color, background_color)
+        surfaces[key] = surface
+        if len(surfaces) > TextRenderer.max_surfaces:
+            surfaces.popitem(last=False)
+        return surface
+
+    # forget all rendered texts
+    @staticmethod
+    def clear() -> None:
+        TextRenderer.surfaces.clear()
@@ -0,0 +1,198 @@
+from .ui_element import *
+from typing import Callable
+
+
+# preview shown above the timeline while dragging
+class TimelinePreview(UIElement):
+    def __init__(
+        self,
+        screen: pygame.Surface,
+        width: int,
+        height: int,
+        font: pygame.font.Font,
+        background_color: str = "#1C1C1C",
+    ) -> None:
+        super().__init__(screen, 0, 0, width, height, background_color)
+        self.font = font
+        self.__image: pygame.Surface = None
+        self.__label: pygame.Surface = None
+        self.__label_text = ""
+
+    # set the image and the time label, redraw only when they change
+    def set_content(self, image: pygame.Surface, label: str) -> None:
+        if image is self.__image and self.__label and label == self.__label_text:
+            return
+        self.__image = image
+        self.__label_text = label
+        self.__label = self.font.render(label, True, "#ffffff")
+        self.mark_dirty()
+
+    # override
+    def _on_update(self) -> None:
+        return
+
+    # override
+    def _on_draw(self) -> None:
+        if self.__image:
+            self._surface.blit(self.__image, (0, 0))
+        if self.__label:
+            rect = self.__label.get_rect()
+            rect.midbottom = (self.width // 2, self.height - 2)
+            self._surface.blit(self.__label, rect)
+
+
+# seekable bar of the video time with ticks at segment starts. dragging it
+# shows previews and seeks only once on release
+class Timeline(UIElement):
+    def __init__(
+        self,
+        screen: pygame.Surface,
+        x: int,
+        y: int,
+        width: int,
+        height: int,
+        font: pygame.font.Font,
+        on_seek: Callable[[float], None] = None,  # called with the time in seconds
+        get_preview: Callable[[float], pygame.Surface] = None,  # by time in seconds
+        preview_size: tuple[int, int] = (160, 90),
+        color_bar: str = "#50555e",
+        color_played: str = "#7a8291",
+        color_tick: str = "#DADDD8",
+        color_cursor: str = "#ffffff",
+    ) -> None:
+        super().__init__(screen, x, y, width, height, color_bar)
+        self.on_seek = on_seek
+        self.get_preview = get_preview
+        self.color_played = color_played
+        self.color_tick = color_tick
+        self.color_cursor = color_cursor
+
+        self.__duration = 0.0  # in seconds
+        self.__position = 0.0  # in seconds
+        self.__ticks: list[tuple[float, int]] = []  # of (time, level)
+        self.__dragging = False
+        self.__drag_position = 0.0  # in seconds
+        self.__cursor_x = -1  # where the cursor was drawn
+
+        # the preview is a separate element so it can be drawn outside the bar
+        self.__preview = TimelinePreview(screen, *preview_size, font)
+        self.__preview.visible = False
+
+    @property
+    def duration(self) -> float:
+        return self.__duration
+
+    @duration.setter
+    def duration(self, value: float) -> None:
+        if value != self.__duration:
+            self.__duration = value
+            self.mark_dirty()
+
+    # current time in seconds, ignored while dragging
+    @property
+    def position(self) -> float:
+        return self.__drag_position if self.__dragging else self.__position
+
+    @position.setter
+    def position(self, value: float) -> None:
+        self.__position = value
+        self.__update_cursor()
+
+    @property
+    def dragging(self) -> bool:
+        return self.__dragging
+
+    # add ticks at times in seconds, lower levels are drawn taller
+    def add_ticks(self, ticks: list[tuple[float, int]]) -> None:
+        self.__ticks.extend(ticks)
+        self.mark_dirty()
+
+    # remove all ticks
+    def clear_ticks(self) -> None:
+        self.__ticks = []
+        self.mark_dirty()
+
+    # override
+    def _on_update(self) -> None:
+        mouse_position = pygame.mouse.get_pos()
+        pressed = pygame.mouse.get_pressed()[0]
+
+        if not self.__dragging:
+            # start dragging when pressed on the bar
+            if (
+                pressed
+                and self.visible
+                and self.__duration > 0
+                and self.get_active_area().collidepoint(mouse_position)
+            ):
+                self.__dragging = True
+            else:
+                return
+
+        self.__drag_position = self.__to_time(mouse_position[0])
+        if pressed:
+            self.__update_preview()
+            self.__update_cursor()
+            return
+
+        # seek once on release
+        self.__dragging = False
+        self.__preview.visible = False
+        self.__position = self.__drag_position
+        self.__update_cursor()
+        if self.on_seek:
+            self.on_seek(self.__drag_position)
+
+    # override
+    def _on_draw(self) -> None:
+        if self.__duration <= 0:
+            return
+
+        # played part
+        x = self.__to_x(self.position)
+        pygame.draw.rect(self._surface, self.color_played, (0, 0, x, self.height))
+
+        # segment ticks, scenes are full height
+        for time, level in self.__ticks:
+            tick_x = self.__to_x(time)
+            top = self.height * level // 3
+            pygame.draw.line(
+                self._surface, self.color_tick, (tick_x, top), (tick_x, self.height)
+            )
+
+        pygame.draw.rect(self._surface, self.color_cursor, (x - 1, 0, 3, self.height))
+
+    # redraw only when the cursor moves to another pixel
+    def __update_cursor(self) -> None:
+        x = self.__to_x(self.position)
+        if x != self.__cursor_x:
+            self.__cursor_x = x
+            self.mark_dirty()
+
+    # show the preview of the dragged time above the bar
+    def __update_preview(self) -> None:
+        preview = self.__preview
+        image = self.get_preview(self.__drag_position) if self.get_preview else None
+
+        seconds = int(self.__drag_position)
+        label = "{:02d}:{:02d}:{:02d}".format(
+            seconds // 3600, seconds % 3600 // 60, seconds % 60
+        )
+        preview.set_content(image, label)
+
+        world_rect = self.world_rect
+        x = world_rect.x + self.__to_x(self.__drag_position) - preview.width // 2
+        preview.x = max(world_rect.x, min(x, world_rect.right - preview.width))
+        preview.y = world_rect.y - preview.height - 4
+        preview.visible = True
+
+    # convert a time in seconds to a position on the bar
+    def __to_x(self, time: float) -> int:
+        if self.__duration <= 0:
+            return 0
+        return round(max(0.0, min(time / self.__duration, 1.0)) * (self.width - 1))
+
+    # convert a position in world space to a time in seconds
+    def __to_time(self, x: int) -> float:
+        ratio = (x - self.world_rect.x) / max(1, self.width - 1)
+        return max(0.0, min(ratio, 1.0)) * self.__duration
@@ -3,18 +3,52 @@ from abc import ABC, abstractmethod
 import pygame
 
 
-# abstract class for ui elements
+# abstract class for ui elements.
+# elements only redraw the regions that changed: an element calls mark_dirty
+# when its appearance changes, and moving, resizing or hiding it marks the
+# covered regions dirty. dirty regions propagate to the parents and finally
+# to the screen, so only those are recomposed and pushed to the display
 class UIElement(ABC):
     elements: list[UIElement] = []  # list of all ui elements
 
-    # update all elements
+    # dirty regions of the screen, and the screen they belong to
+    __screen_dirty_rects: list[pygame.Rect] = []
+    __dirty_screen: pygame.Surface = None
+
+    # max dirty regions kept per element before they are merged into one
+    max_dirty_rects: int = 8
+
+    # update all elements, redraw the dirty regions of the screen and return
+    # them. the regions are cleared with background_color first if given
     @staticmethod
-    def update_all() -> None:
-        for element in UIElement.elements:
-            if element._parent:
-                continue
+    def update_all(background_color: str = None) -> list[pygame.Rect]:
+        roots = [element for element in UIElement.elements if not element._parent]
+        for element in roots:
             element.__update()
 
+        rects = UIElement.__screen_dirty_rects
+        screen = UIElement.__dirty_screen
+        UIElement.__screen_dirty_rects = []
+        if not rects or not screen:
+            return []
+
+        # recompose the dirty regions from all elements covering them
+        for rect in rects:
+            screen.set_clip(rect)
+            if background_color:
+                screen.fill(background_color, rect)
+            for element in roots:
+                if element.visible and element.world_rect.colliderect(rect):
+                    screen.blit(element._surface, (element.x, element.y), element._rect)
+        screen.set_clip(None)
+        return rects
+
+    # mark all elements to be redrawn entirely
+    @staticmethod
+    def invalidate_all() -> None:
+        for element in UIElement.elements:
+            element.mark_dirty()
+
     # initialize an element with a target surface, position, and dimension
     def __init__(
         self,
@@ -26,19 +60,46 @@ class UIElement(ABC):
         background_color: str = None,
     ) -> None:
         self._screen = screen
-        self.x = x
-        self.y = y
+        self.__x = x
+        self.__y = y
         self.__width = width
         self.__height = height
-        self.background_color = background_color
+        self.__background_color = background_color
 
         self._surface = pygame.Surface((self.__width, self.__height))
         self._rect = pygame.Rect(0, 0, self.__width, self.__height)
         self._children: list[UIElement] = []
         self._parent = None
 
-        self.visible = True
+        self.__visible = True
+        self.__redraw = True  # whether the whole element has to be redrawn
+        self.__dirty_rects: list[pygame.Rect] = []  # in local coordinates
         UIElement.elements.append(self)
+        self.__invalidate_area()
+
+    @property
+    def x(self) -> int:
+        return self.__x
+
+    @x.setter
+    def x(self, value: int) -> None:
+        if value == self.__x:
+            return
+        self.__invalidate_area()
+        self.__x = value
+        self.__invalidate_area()
+
+    @property
+    def y(self) -> int:
+        return self.__y
+
+    @y.setter
+    def y(self, value: int) -> None:
+        if value == self.__y:
+            return
+        self.__invalidate_area()
+        self.__y = value
+        self.__invalidate_area()
 
     @property
     def width(self) -> int:
@@ -46,11 +107,7 @@ class UIElement(ABC):
 
     @width.setter
     def width(self, value: int) -> None:
-        self.__width = value
-        self._surface = pygame.Surface((self.__width, self.__height))
-        self._rect = pygame.Rect(
-            self._rect.x, self._rect.y, self.__width, self.__height
-        )
+        self._set_size(value, self.__height)
 
     @property
     def height(self) -> int:
@@ -58,11 +115,47 @@ class UIElement(ABC):
 
     @height.setter
     def height(self, value: int) -> None:
-        self.__height = value
-        self._surface = pygame.Surface((self.__width, self.__height))
-        self._rect = pygame.Rect(
-            self._rect.x, self._rect.y, self.__width, self.__height
-        )
+        self._set_size(self.__width, value)
+
+    # resize the element, with a surface of the new size if given instead of
+    # a new blank one
+    def _set_size(
+        self, width: int, height: int, surface: pygame.Surface = None
+    ) -> None:
+        self.__invalidate_area()
+        self.__width = width
+        self.__height = height
+        if surface is None:
+            surface = pygame.Surface((width, height))
+        self._surface = surface
+        self._rect = pygame.Rect(self._rect.x, self._rect.y, width, height)
+        self.mark_dirty()
+
+    @property
+    def visible(self) -> bool:
+        return self.__visible
+
+    @visible.setter
+    def visible(self, value: bool) -> None:
+        if value == self.__visible:
+            return
+        # the area is invalidated while the element is visible
+        if not value:
+            self.__invalidate_area()
+        self.__visible = value
+        if value:
+            self.__invalidate_area()
+
+    @property
+    def background_color(self) -> str:
+        return self.__background_color
+
+    @background_color.setter
+    def background_color(self, value: str) -> None:
+        if value == self.__background_color:
+            return
+        self.__background_color = value
+        self.mark_dirty()
 
     # get the rect in world space
     @property
@@ -80,6 +173,8 @@ class UIElement(ABC):
 
     @parent.setter
     def parent(self, value: UIElement) -> None:
+        self.__invalidate_area()
+
         # if parent exists, remove it
         if self._parent:
             self._parent._children.remove(self)
@@ -89,6 +184,7 @@ class UIElement(ABC):
         if value:
             value._children.append(self)
             value._on_child_added()
+        self.__invalidate_area()
 
     # get the active area in world space
     def get_active_area(self) -> pygame.Rect:
@@ -97,50 +193,138 @@ class UIElement(ABC):
             area = area.clip(self._parent.get_active_area())
         return area
 
+    # mark the whole element to be redrawn
+    def mark_dirty(self) -> None:
+        self.__redraw = True
+        self.__invalidate_area()
+
     # delete this element and all its children
     def delete(self) -> None:
         self.delete_all_children()
-        self.background_color = None
-        self._surface = None
-        self._rect = None
         self.parent = None
         self.visible = False
+        self.__background_color = None
+        self._surface = None
+        self._rect = None
         UIElement.elements.remove(self)
 
     # delete all children
     def delete_all_children(self) -> None:
-        while self._children:
-            self._children[-1].delete()
+        if not self._children:
+            return
 
-    # update the element and its children once per frame
-    def __update(self) -> None:
-        # if background color is not None, fill the surface
-        if self.background_color:
-            self._surface.fill(self.background_color)
+        # drop all descendants from the element list in one pass,
+        # removing them one by one is quadratic
+        deleted = set()
+        for child in self._children:
+            child.__release(deleted)
+        self._children = []
+        self.mark_dirty()
+        UIElement.elements = [
+            element for element in UIElement.elements if element not in deleted
+        ]
 
-        self._on_update()
+    # detach this element and its descendants, collecting them in deleted
+    def __release(self, deleted: set[UIElement]) -> None:
         for child in self._children:
-            child.__update()
-        self.__draw()
+            child.__release(deleted)
+        self._children = []
+        self._parent = None
+        self.__visible = False
+        self.__background_color = None
+        self._surface = None
+        self._rect = None
+        deleted.add(self)
+
+    # mark the area covered by this element as dirty in its parent or the screen
+    def __invalidate_area(self) -> None:
+        if not self.__visible:
+            return
+        rect = pygame.Rect(self.__x, self.__y, self.__width, self.__height)
+        if self._parent:
+            self._parent.__add_dirty_rect(rect)
+        else:
+            UIElement.__add_screen_dirty_rect(self._screen, rect)
 
-    # draw the element to the screen
-    def __draw(self) -> None:
-        if not self.visible:
+    # mark a region of this element, in local coordinates, as dirty
+    def __add_dirty_rect(self, rect: pygame.Rect) -> None:
+        rect = rect.clip(pygame.Rect(0, 0, self.__width, self.__height))
+        if rect.width <= 0 or rect.height <= 0 or self.__redraw:
+            # the whole element is redrawn already, but the parent still
+            # has to recompose the region
+            if self.__redraw and rect.width > 0 and rect.height > 0:
+                self.__propagate_dirty_rect(rect)
             return
 
-        # draw on the screen
-        surface = self._screen
+        self.__dirty_rects.append(rect)
+        if len(self.__dirty_rects) > UIElement.max_dirty_rects:
+            self.__dirty_rects = [self.__dirty_rects[0].unionall(self.__dirty_rects)]
+        self.__propagate_dirty_rect(rect)
 
-        # if parent exists, draw on the parent's surface
+    # mark a region of this element dirty in its parent or the screen
+    def __propagate_dirty_rect(self, rect: pygame.Rect) -> None:
+        if not self.__visible:
+            return
+        rect = rect.move(self.__x, self.__y)
         if self._parent:
-            surface = self._parent._surface
-        surface.blit(self._surface, (self.x, self.y), self._rect)
+            self._parent.__add_dirty_rect(rect)
+        else:
+            UIElement.__add_screen_dirty_rect(self._screen, rect)
+
+    # mark a region of the screen dirty
+    @staticmethod
+    def __add_screen_dirty_rect(screen: pygame.Surface, rect: pygame.Rect) -> None:
+        rect = rect.clip(screen.get_rect())
+        if rect.width <= 0 or rect.height <= 0:
+            return
+        UIElement.__dirty_screen = screen
+        rects = UIElement.__screen_dirty_rects
+        rects.append(rect)
+        if len(rects) > UIElement.max_dirty_rects:
+            UIElement.__screen_dirty_rects = [rects[0].unionall(rects)]
+
+    # update the element and its children once per frame,
+    # then redraw the regions that changed
+    def __update(self) -> None:
+        self._on_update()
+        for child in self._children:
+            child.__update()
+
+        if self.__redraw:
+            self.__redraw = False
+            self.__dirty_rects = []
+            self.__draw(None)
+        elif self.__dirty_rects:
+            rects, self.__dirty_rects = self.__dirty_rects, []
+            for rect in rects:
+                self.__draw(rect)
+
+    # draw the element and its children to its surface, within clip if given
+    def __draw(self, clip: pygame.Rect) -> None:
+        if self._surface is None:
+            return
+
+        self._surface.set_clip(clip)
+        if self.__background_color:
+            self._surface.fill(self.__background_color, clip)
+        self._on_draw()
+        for child in self._children:
+            if not child.visible:
+                continue
+            if clip and not clip.colliderect((child.x, child.y, child.width, child.height)):
+                continue
+            self._surface.blit(child._surface, (child.x, child.y), child._rect)
+        self._surface.set_clip(None)
 
     # called on update
     @abstractmethod
     def _on_update(self) -> None:
         pass
 
+    # called when the element is redrawn, after its background is filled
+    def _on_draw(self) -> None:
+        pass
+
     # called when a new child is added
     def _on_child_added(self) -> None:
         pass
@@ -0,0 +1,255 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from collections import deque
+import cv2
+import numpy as np
+from .profiler import Profiler
+
+
+# decodes, resizes and color converts video frames ahead on a thread,
+# into a bounded ring buffer of preallocated frames. in follow mode the video
+# is reopened at its end until frames are appended to it, for recordings that
+# are still being written
+class VideoDecoder:
+    def __init__(
+        self,
+        video_path: str,
+        width: int,
+        height: int,
+        capacity: int = 8,
+        profiler: Profiler = None,
+        api_preference: int = cv2.CAP_ANY,  # backend to read the video with
+        follow: bool = False,
+        poll_interval: float = 0.5,  # in seconds, between reopens in follow mode
+    ):
+        self.width = width
+        self.height = height
+        self.profiler = profiler  # measures decode, resize and convert
+        self.follow = follow
+        self.poll_interval = poll_interval
+
+        self.__path = video_path
+        self.__api_preference = api_preference
+        self.__capture = cv2.VideoCapture(video_path, api_preference)
+        if not self.__capture.isOpened():
+            raise IOError("cannot open video: " + video_path)
+        self.fps = self.__capture.get(cv2.CAP_PROP_FPS)
+        self.frame_count = int(self.__capture.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        # frames are stored as (height, width, rgb)
+        self.__frames = np.empty((capacity, height, width, 3), dtype=np.uint8)
+        self.__numbers = [0] * capacity  # frame number of each slot
+        self.__resized = np.empty((height, width, 3), dtype=np.uint8)
+
+        self.__read_slot = 0  # next slot to read
+        self.__ready = 0  # number of decoded frames not read yet
+        self.__held = False  # whether the last read slot is still in use
+        self.__position = 0  # next frame to decode
+        self.__seek_target: int = None
+        self.__seek_start = 0.0  # when the pending seek was requested
+        self.__keyframes = np.zeros(0, dtype=np.int64)
+        self.seek_latencies = deque(maxlen=100)  # of recent seeks, in seconds
+        self.__ended = False
+        self.__waiting = False  # for frames to be appended, in follow mode
+        self.__stopped = False
+        self.__file_size = self.__get_file_size()  # when last opened
+        self.__reopen_time = 0.0  # in seconds, of the last reopen
+
+        self.__condition = threading.Condition()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    @property
+    def capacity(self) -> int:
+        return len(self.__frames)
+
+    # whether all frames until the end of the video have been read
+    @property
+    def ended(self) -> bool:
+        with self.__condition:
+            return self.__ended and self.__ready == 0
+
+    # whether all frames written so far have been decoded, in follow mode
+    @property
+    def waiting(self) -> bool:
+        with self.__condition:
+            return self.__waiting and self.__ready == 0
+
+    # get the next decoded frame and its number, None if it is not ready yet.
+    # the frame stays valid until the next call
+    def read(self, timeout: float = 0) -> tuple[int, np.ndarray] | None:
+        with self.__condition:
+            # the previous frame is not in use anymore
+            if self.__held:
+                self.__held = False
+                self.__read_slot = (self.__read_slot + 1) % self.capacity
+                self.__condition.notify_all()
+
+            if timeout > 0:
+                self.__condition.wait_for(
+                    lambda: self.__ready > 0 or self.__ended or self.__stopped,
+                    timeout,
+                )
+            if self.__ready == 0:
+                return None
+
+            self.__ready -= 1
+            self.__held = True
+            slot = self.__read_slot
+            return self.__numbers[slot], self.__frames[slot]
+
+    # time in seconds between the last seek and its first decoded frame
+    @property
+    def seek_latency(self) -> float:
+        return self.seek_latencies[-1] if self.seek_latencies else 0.0
+
+    # set the sorted frame numbers of keyframes, used for seeking
+    def set_keyframes(self, keyframes: np.ndarray) -> None:
+        with self.__condition:
+            self.__keyframes = np.asarray(keyframes, dtype=np.int64)
+
+    # drop the decoded frames and continue decoding from a frame
+    def seek(self, frame: int) -> None:
+        with self.__condition:
+            self.__seek_target = max(0, frame)
+            self.__seek_start = time.perf_counter()
+            self.__ended = False
+            self.__waiting = False
+            self.__flush()
+            self.__condition.notify_all()
+
+    # stop decoding and release the video
+    def stop(self) -> None:
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify_all()
+        self.__thread.join()
+        self.__capture.release()
+
+    # drop all decoded frames, keeping the one in use
+    def __flush(self) -> None:
+        if self.__held:
+            self.__held = False
+            self.__read_slot = (self.__read_slot + 1) % self.capacity
+        self.__ready = 0
+
+    # decode frames until stopped
+    def __run(self) -> None:
+        while True:
+            with self.__condition:
+                # wait for a free slot, the one in use can't be written
+                self.__condition.wait_for(
+                    lambda: self.__stopped
+                    or self.__seek_target is not None
+                    or (not self.__ended and self.__ready + self.__held < self.capacity)
+                )
+                if self.__stopped:
+                    return
+
+                seek_target, self.__seek_target = self.__seek_target, None
+                seek_start = self.__seek_start
+                keyframes = self.__keyframes
+
+                # the slot after the last decoded frame
+                slot = (self.__read_slot + self.__held + self.__ready) % self.capacity
+
+            if seek_target is not None:
+                self.__seek(seek_target, keyframes)
+            position = self.__position
+
+            # decode without holding the lock, straight into the free slot
+            profiler = self.profiler
+            start = time.perf_counter()
+            success, frame = self.__capture.read()
+            if success:
+                # the capture has moved on, even if the frame gets discarded
+                self.__position += 1
+                decoded = time.perf_counter()
+                cv2.resize(frame, (self.width, self.height), self.__resized)
+                resized = time.perf_counter()
+                cv2.cvtColor(self.__resized, cv2.COLOR_BGR2RGB, self.__frames[slot])
+                if profiler:
+                    profiler.add("decode", decoded - start)
+                    profiler.add("resize", resized - decoded)
+                    profiler.add("convert", time.perf_counter() - resized)
+
+            reopen = False
+            with self.__condition:
+                # a seek happened meanwhile, the frame is outdated
+                if self.__seek_target is not None or self.__stopped:
+                    continue
+
+                if success:
+                    self.__numbers[slot] = position
+                    self.__ready += 1
+                    self.__waiting = False
+                    # the frame count of a growing video is only an estimate
+                    self.frame_count = max(self.frame_count, self.__position)
+                    if seek_target is not None:
+                        self.seek_latencies.append(time.perf_counter() - seek_start)
+                elif self.follow:
+                    # wait for frames to be appended, unless seeking or stopping.
+                    # reopening may decode the video from the start again if
+                    # it can't seek in it, so it is done less often when slow
+                    self.__waiting = True
+                    self.__condition.notify_all()
+                    self.__condition.wait_for(
+                        lambda: self.__stopped or self.__seek_target is not None,
+                        max(self.poll_interval, 4 * self.__reopen_time),
+                    )
+                    reopen = not self.__stopped
+                else:
+                    self.__ended = True
+                self.__condition.notify_all()
+
+            if reopen:
+                self.__reopen()
+
+    # reopen the video to read the frames written since it was opened, and
+    # move to the next frame to decode. nothing is done if the file has not
+    # grown, the open video can still seek
+    def __reopen(self) -> None:
+        file_size = self.__get_file_size()
+        if file_size >= 0 and file_size == self.__file_size:
+            return
+        self.__file_size = file_size
+
+        start = time.perf_counter()
+        self.__capture.release()
+        self.__capture = cv2.VideoCapture(self.__path, self.__api_preference)
+        frame_count = int(self.__capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.frame_count = max(self.frame_count, frame_count)
+
+        position, self.__position = self.__position, 0
+        with self.__condition:
+            keyframes = self.__keyframes
+        self.__seek(position, keyframes)
+        self.__reopen_time = time.perf_counter() - start
+
+    # get the size of the video file in bytes, -1 if it is not a file
+    def __get_file_size(self) -> int:
+        try:
+            return os.path.getsize(self.__path)
+        except OSError:
+            return -1
+
+    # move the capture to a frame: seek to the last keyframe before it, then
+    # skip to the frame without decoding images
+    def __seek(self, target: int, keyframes: np.ndarray) -> None:
+        if len(keyframes) == 0:
+            # let the backend find the frame
+            self.__capture.set(cv2.CAP_PROP_POS_FRAMES, target)
+            self.__position = int(self.__capture.get(cv2.CAP_PROP_POS_FRAMES))
+            return
+
+        i = np.searchsorted(keyframes, target, "right") - 1
+        keyframe = int(keyframes[i]) if i >= 0 else 0
+
+        # no need to seek if the target is ahead in the same group of pictures
+        if not keyframe <= self.__position <= target:
+            self.__capture.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+            self.__position = keyframe
+        while self.__position < target and self.__capture.grab():
+            self.__position += 1
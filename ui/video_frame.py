@@ -1,5 +1,10 @@
-from .ui_element import *
+import time
 import cv2
+from .ui_element import *
+from .video_decoder import VideoDecoder
+from .av_sync import AVSync
+from .pcm_audio import PCMAudio
+from .profiler import Profiler
 
 
 def to_HMS(seconds: int) -> str:
@@ -19,126 +24,245 @@ class VideoFrame(UIElement):
         width: int,
         height: int,
         background_color: str = "#ffffff",
+        profiler: Profiler = None,
     ) -> None:
         pygame.mixer.init()
-        super().__init__(screen, x, y, width, height, background_color=background_color)
+        # the surface keeps the last frame, so it is only filled when there is
+        # no video instead of on every update
+        super().__init__(screen, x, y, width, height)
+        self.__background_color = background_color
+        self._surface.fill(background_color)
 
-        self.__frame = None
-        self.__capture: cv2.VideoCapture = None
-        self.__fps = 0
-        self.__duration = 0
+        self.profiler = profiler  # measures blitting and the decoder stages
+        self.__audio = PCMAudio()  # loaded once, the master clock
+        self.__decoder: VideoDecoder = None
+        self.__proxy = False  # whether the decoder reads a proxy of the video
+        self.__sync: AVSync = None
+        self.__fps = 0.0  # not rounded, seeks and times drift otherwise
         self.__current_time = 0  # in seconds
-
-        self.__update_interval = 0
-        self.__frame_count = 0
+        self.__number = 0  # of the last read frame
+        self.__frame = None  # last read frame, valid until the next read
         self.__playing = False
+        self.__holding = False  # at the end of a growing video, for new frames
 
     @property
-    def fps(self) -> int:
+    def fps(self) -> float:
         return self.__fps
 
     @property
     def duration(self) -> str:
-        return to_HMS(self.__duration)
+        return to_HMS(int(self.duration_seconds))
 
     @property
     def current_time(self) -> str:
         return to_HMS(self.__current_time)
 
+    @property
+    def playing(self) -> bool:
+        return self.__playing
+
+    # duration in seconds, grows with the video in follow mode
+    @property
+    def duration_seconds(self) -> float:
+        if not self.__decoder:
+            return 0
+        return self.__decoder.frame_count / self.__fps
+
+    # time of the shown frame in seconds
+    @property
+    def current_seconds(self) -> float:
+        return self.__current_time
+
+    # time in seconds the last jump took to show its frame
+    @property
+    def seek_latency(self) -> float:
+        return self.__decoder.seek_latency if self.__decoder else 0.0
+
+    # synchronization of the loaded video, None if there is no video
+    @property
+    def sync(self) -> AVSync:
+        return self.__sync
+
+    # set the sorted frame numbers of the keyframes of the loaded video
+    def set_keyframes(self, keyframes) -> None:
+        # every frame of a proxy is a keyframe
+        if self.__decoder and not self.__proxy:
+            self.__decoder.set_keyframes(keyframes)
+
     # toggle playing state
     def toggle(self) -> None:
-        self.__playing = not self.__playing
+        if self.__playing:
+            self.pause()
+        else:
+            self.play()
 
     # play the video
     def play(self) -> None:
-        if self.__current_time > 0:
-            pygame.mixer.music.unpause()
-        else:
-            pygame.mixer.music.play()
+        if not self.__decoder or self.__playing:
+            return
+
+        self.__audio.play()
+        self.__sync.resume()
         self.__playing = True
 
     # pause the video
     def pause(self) -> None:
-        pygame.mixer.music.pause()
+        # the clock stops at the audio position before the audio stops
+        if self.__sync:
+            self.__sync.pause()
+        self.__audio.pause()
         self.__playing = False
+        self.__holding = False
 
     # move to the beginning and pause the video
     def stop(self) -> None:
-        self.__playing = False
+        self.pause()
         self.jump_to(0)
-        pygame.mixer.music.stop()
-
-    # set the update interval based on program fps
-    def set_interval(self, program_fps: int) -> None:
-        if not self.__capture:
-            return
 
-        video_fps = int(self.__capture.get(cv2.CAP_PROP_FPS))
-        self.__update_interval = max(1, program_fps / video_fps)
-        self.__frame_count = 0
-
-    # load a video from the specified path
-    def load(self, video_path: str = None, audio_path: str = None) -> None:
-        if self.__capture:
-            self.__capture.release()
+    # load a video from the specified path, following the frames appended
+    # to it if follow
+    def load(
+        self, video_path: str = None, audio_path: str = None, follow: bool = False
+    ) -> None:
+        if self.__decoder:
+            self.__decoder.stop()
+        self.__proxy = False
 
         if video_path and audio_path:
-            self.__capture = cv2.VideoCapture(video_path)
-            self.__fps = int(self.__capture.get(cv2.CAP_PROP_FPS))
-            self.__duration = int(
-                self.__capture.get(cv2.CAP_PROP_FRAME_COUNT) / self.__fps
+            self.__decoder = VideoDecoder(
+                video_path,
+                self.width,
+                self.height,
+                profiler=self.profiler,
+                follow=follow,
             )
-            pygame.mixer.music.load(audio_path)
+            self.__sync = AVSync(self.__decoder.fps, self.__audio.get_position)
+            self.__fps = self.__decoder.fps
+            self.__audio.load(audio_path)
         else:
-            self.__capture = None
-            self.__fps = 0
-            self.__duration = 0
+            self.__audio.close()
+            self.__decoder = None
+            self.__sync = None
+            self.__fps = 0.0
+            self._surface.fill(self.__background_color)
+            self.mark_dirty()
 
         self.__current_time = 0
-        self.__next()
+        self.__number = 0
+        self.__playing = False
+        self.__holding = False
+        self.__next(1)
+
+    # play and seek from an intra-only proxy of the loaded video made at the
+    # size of this frame, read with the capture api it was written with, see
+    # segmentation.make_proxy
+    def use_proxy(self, path: str, api_preference: int = cv2.CAP_ANY) -> None:
+        if not self.__decoder:
+            return
+
+        decoder = VideoDecoder(
+            path,
+            self.width,
+            self.height,
+            profiler=self.profiler,
+            api_preference=api_preference,
+        )
+        self.__decoder.stop()
+        self.__decoder = decoder
+        self.__proxy = True
+
+        # continue after the shown frame
+        decoder.seek(self.__number + 1)
+
+    # release the loaded video
+    def close(self) -> None:
+        self.load()
 
     # jump to the specified time in seconds
     def jump_to(self, time: float) -> None:
-        self.__capture.set(cv2.CAP_PROP_POS_MSEC, time * 1000)
-        self.__current_time = (
-            int(self.__capture.get(cv2.CAP_PROP_POS_FRAMES)) / self.__fps
-        )
-        self.__next()
+        if not self.__decoder:
+            return
 
-        pygame.mixer.music.play(0, time, 0)
-        if not self.__playing:
-            pygame.mixer.music.pause()
+        self.__decoder.seek(round(time * self.__fps))
+        self.__next(1)
+
+        # the audio continues from the sample of the time, also if it ended
+        if self.__playing:
+            self.__audio.play(time)
+        else:
+            self.__audio.seek(time)
+        self.__sync.seek(time)
 
     # override
     def _on_update(self) -> None:
-        # if video is playing
-        if self.__playing:
-            # increment counter
-            self.__frame_count += 1
-
-            # if counter reached the interval to update
-            if self.__frame_count >= self.__update_interval:
-                self.__frame_count = 0
-
-                # try update video frame
-                updated = self.__next()
-                self.__current_time += 1 / self.__fps
-                if not updated:
-                    self.__playing = False
-
-        # always display a frame
-        if self.__frame is not None:
-            self._surface = pygame.surfarray.make_surface(self.__frame)
-
-    # move to the next frame
-    def __next(self) -> bool:
-        if not self.__capture:
+        self.__audio.update()
+        if not self.__playing:
+            return
+
+        # the clock and the audio continue from the shown frame once frames
+        # have been appended to the growing video
+        if self.__holding:
+            if self.__decoder.waiting:
+                return
+            self.__holding = False
+            self.__audio.play(self.__current_time)
+            self.__sync.start(self.__current_time)
+
+        # the audio is the master clock, wait if video is ahead of it
+        target = self.__sync.target_frame
+        if target <= self.__number:
+            return
+
+        # if video is too far behind to catch up by dropping decoded frames,
+        # skip to the target by seeking, which only grabs the frames between
+        if target - self.__number > self.__sync.max_drop:
+            self.__sync.skipped_frames += target - self.__number - 1
+            self.__decoder.seek(target)
+            self.__next(1)
+            return
+
+        # drop late frames until the target, if it is not decoded yet try
+        # again on the next update
+        while self.__read():
+            if self.__number >= target:
+                self.__show()
+                return
+            self.__sync.dropped_frames += 1
+        if self.__decoder.ended:
+            self.__playing = False
+        # at the end of a growing video, hold the clock and the audio at the
+        # shown frame until frames arrive
+        elif self.__decoder.waiting:
+            self.__holding = True
+            self.__audio.pause()
+            self.__sync.pause()
+            self.__sync.seek(self.__current_time)
+
+    # move to the next decoded frame and show it, waiting up to timeout
+    # seconds for it
+    def __next(self, timeout: float = 0) -> bool:
+        if not self.__read(timeout):
             return False
+        self.__show()
+        return True
 
-        success, self.__frame = self.__capture.read()
-        if not success:
+    # read the next decoded frame without showing it
+    def __read(self, timeout: float = 0) -> bool:
+        if not self.__decoder:
             return False
 
-        self.__frame = cv2.resize(self.__frame, (self.width, self.height))
-        self.__frame = cv2.cvtColor(self.__frame, cv2.COLOR_BGR2RGB).swapaxes(0, 1)
+        result = self.__decoder.read(timeout)
+        if result is None:
+            return False
+        self.__number, self.__frame = result
         return True
+
+    # copy the last read frame into the persistent surface
+    def __show(self) -> None:
+        start = time.perf_counter()
+        pygame.surfarray.blit_array(self._surface, self.__frame.swapaxes(0, 1))
+        if self.profiler:
+            self.profiler.add("blit", time.perf_counter() - start)
+        self.mark_dirty()
+        self.__current_time = self.__number / self.__fps
+        self.__sync.record(self.__number)
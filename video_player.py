@@ -1,9 +1,10 @@
 import os.path
+from bisect import bisect_right
 
 import pygame
 import ui
+import segmentation
 from tkinter import Tk, filedialog
-from scenedetect import detect, AdaptiveDetector, FrameTimecode
 
 
 class VideoPlayer:
@@ -17,17 +18,53 @@ class VideoPlayer:
         subshot_threshold: float,
         background_color: str = "#C2E7D9",
         program_fps: int = 60,
+        segmentation_workers: int = 1,
+        analysis_width: int = None,
+        analysis_stride: int = 1,
+        profile_trace_path: str = None,
+        playback_proxy: bool = False,
+        idle_wait: bool = True,
+        audio_assisted: bool = True,
+        follow: bool = False,
+        scene_similarity: float = None,
+        index_dir: str = None,
     ):
         self.title = title
         self.window_width = window_width
         self.window_height = window_height
         self.background_color = background_color
-        self.__scene_threshold = scene_threshold
-        self.__shot_threshold = shot_threshold
-        self.__subshot_threshold = subshot_threshold
+        self.__segmenter = segmentation.Segmenter(
+            scene_threshold,
+            shot_threshold,
+            subshot_threshold,
+            workers=segmentation_workers,
+            analysis_width=analysis_width,
+            stride=analysis_stride,
+            scene_similarity=scene_similarity,
+        )
+        self.__index_cache = segmentation.IndexCache()
+        # proxies are made at the size of the video frame
+        self.__segmentation_worker = segmentation.SegmentationWorker(
+            self.__segmenter,
+            self.__index_cache,
+            (960, 540) if playback_proxy else None,
+            index_dir,
+        )
+        self.__index: segmentation.VideoIndex = None
+        self.__index_params: tuple = None  # segmenter params the index is made with
+        self.__scene_count = 0  # number of scenes with buttons
         self.__program_fps = program_fps
 
         self.__running = True
+        self.__full_redraw = True  # redraw the whole window on the next update
+        self.__idle_wait = idle_wait  # block on events while nothing changes
+        self.__audio_assisted = audio_assisted  # confirm scene cuts by the audio
+        self.__follow = follow  # keep reading frames appended to the video
+
+        # stage times of each frame, written to a trace file if given
+        self.__profiler = ui.Profiler()
+        if profile_trace_path:
+            self.__profiler.start_trace(profile_trace_path)
 
         # NOTE: tkinter has to be initialized before pygame, else pygame will crash on macOS
         self.__init_tkinter()
@@ -37,9 +74,21 @@ class VideoPlayer:
     # start the player
     def start(self):
         while self.__running:
-            self.__handle_events()
+            # when idle, sleep until there is input or a timeout
+            events = []
+            if self.__idle_wait and not self.__is_active():
+                event = pygame.event.wait(self.__get_idle_timeout())
+                if event.type != pygame.NOEVENT:
+                    events.append(event)
+
+            self.__profiler.begin_frame()
+            with self.__profiler.measure("events"):
+                self.__handle_events(events + pygame.event.get())
             self.__update()
 
+        self.__profiler.stop_trace()
+        self.__segmentation_worker.stop()
+        self.__video_frame.close()
         pygame.quit()
         quit()
 
@@ -55,13 +104,30 @@ class VideoPlayer:
 
         self.__screen = pygame.display.set_mode((self.window_width, self.window_height))
         self.__clock = pygame.time.Clock()
-        self.__font = pygame.font.SysFont(None, 24)
+        self.__font = ui.TextRenderer.get_font(None, 24)
+        self.__index_font = ui.TextRenderer.get_font(None, 15)
 
     # initialize UI interface
     def __init_interface(self):
         # init ui elements
-        self.__video_frame = ui.VideoFrame(self.__screen, 10, 10, 960, 540, "#383c44")
-        self.__progress_text = ui.Text(self.__screen, 820, 560, self.__font)
+        self.__video_frame = ui.VideoFrame(
+            self.__screen, 10, 10, 960, 540, "#383c44", self.__profiler
+        )
+        self.__progress_text = ui.Text(self.__screen, 820, 580, self.__font)
+
+        # seeks only once a drag is released, previews come from thumbnails
+        self.__timeline = ui.Timeline(
+            self.__screen,
+            10,
+            556,
+            960,
+            16,
+            self.__index_font,
+            self.__video_frame.jump_to,
+            self.__get_preview,
+        )
+        self.__preview_times: list[float] = []  # sorted segment starts
+        self.__previews: dict[float, object] = {}  # thumbnail or surface by time
 
         self.__buttons_scroll_view = ui.ScrollView(
             self.__screen,
@@ -71,11 +137,15 @@ class VideoPlayer:
             780,
             content_background_color="#383c44",
         )
+        # index buttons are recycled rows, so long indexes stay cheap to show
+        self.__buttons_scroll_view.set_row_factory(
+            25, self.__make_index_button, self.__bind_index_button, 5
+        )
 
         self.__open_button = ui.Button(
             self.__screen,
             10,
-            560,
+            580,
             100,
             60,
             self.__font,
@@ -88,7 +158,7 @@ class VideoPlayer:
         self.__play_button = ui.Button(
             self.__screen,
             290,
-            560,
+            580,
             100,
             60,
             self.__font,
@@ -103,7 +173,7 @@ class VideoPlayer:
         self.__pause_button = ui.Button(
             self.__screen,
             440,
-            560,
+            580,
             100,
             60,
             self.__font,
@@ -118,7 +188,7 @@ class VideoPlayer:
         self.__stop_button = ui.Button(
             self.__screen,
             590,
-            560,
+            580,
             100,
             60,
             self.__font,
@@ -130,18 +200,64 @@ class VideoPlayer:
         )
         # self.__stop_button.visible = False
 
+        # thresholds of the levels, the index is rebuilt from its scores on submit
+        self.__threshold_inputs: list[ui.TextInput] = []
+        for level, name in enumerate(segmentation.LEVEL_NAMES):
+            x = 10 + level * 220
+            ui.Text(self.__screen, x, 668, self.__font, name)
+            self.__threshold_inputs.append(
+                ui.TextInput(
+                    self.__screen,
+                    x + 80,
+                    660,
+                    100,
+                    32,
+                    self.__font,
+                    "{:g}".format(self.__segmenter.get_threshold(level)),
+                    lambda text, level=level: self.__retune(level, text),
+                )
+            )
+
+        # why the last segmentation failed, empty if it did not
+        self.__error_text = ui.Text(
+            self.__screen, 10, 710, self.__index_font, "", "#ff6b6b"
+        )
+
+        # stage times overlay, toggled with F3
+        self.__performance_hud = ui.PerformanceHUD(
+            self.__screen,
+            10,
+            10,
+            self.__profiler,
+            ui.TextRenderer.get_font("monospace", 16),
+        )
+        self.__performance_hud.visible = False
+
     # handle the player events
-    def __handle_events(self):
-        for event in pygame.event.get():
+    def __handle_events(self, events: list[pygame.event.Event] = None):
+        if events is None:
+            events = pygame.event.get()
+
+        for event in events:
+            # typing into a focused threshold is not a shortcut
+            if any(field.handle_event(event) for field in self.__threshold_inputs):
+                continue
+
             if event.type == pygame.QUIT:
                 self.__running = False
 
+            # the window content may have been lost
+            elif event.type == pygame.WINDOWEXPOSED:
+                self.__full_redraw = True
+
             # keyboard events
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
                     self.__video_frame.toggle()
                 elif event.key == pygame.K_ESCAPE:
                     self.__running = False
+                elif event.key == pygame.K_F3:
+                    self.__performance_hud.visible = not self.__performance_hud.visible
 
             # mouse events
             elif event.type == pygame.MOUSEBUTTONDOWN:
@@ -154,16 +270,50 @@ class VideoPlayer:
                     # move content up
                     self.__buttons_scroll_view.scroll(False)
 
+    # whether anything may change without input, so updates run at full rate
+    def __is_active(self) -> bool:
+        return (
+            self.__full_redraw
+            or self.__video_frame.playing
+            or self.__timeline.dragging
+            or self.__buttons_scroll_view.dragging
+            or self.__performance_hud.visible
+            or any(pygame.mouse.get_pressed())
+        )
+
+    # get how long to wait for input in ms while idle, the segmentation
+    # worker still sends its results meanwhile
+    def __get_idle_timeout(self) -> int:
+        if self.__segmentation_worker.busy:
+            return 100
+        return 1000
+
     # do updates
     def __update(self):
-        self.__screen.fill(self.background_color)
-
         self.__progress_text.text = "{} / {}".format(
             self.__video_frame.current_time, self.__video_frame.duration
         )
-
-        ui.UIElement.update_all()
-        pygame.display.update()
+        self.__timeline.duration = self.__video_frame.duration_seconds
+        self.__timeline.position = self.__video_frame.current_seconds
+        with self.__profiler.measure("segmentation"):
+            self.__handle_segmentation_events()
+
+        # redraw everything only when needed, otherwise only the dirty regions
+        if self.__full_redraw:
+            self.__full_redraw = False
+            self.__screen.fill(self.background_color)
+            ui.UIElement.invalidate_all()
+            with self.__profiler.measure("update_all"):
+                ui.UIElement.update_all(self.background_color)
+            with self.__profiler.measure("display_update"):
+                pygame.display.update()
+        else:
+            with self.__profiler.measure("update_all"):
+                rects = ui.UIElement.update_all(self.background_color)
+            if rects:
+                with self.__profiler.measure("display_update"):
+                    pygame.display.update(rects)
+        self.__profiler.end_frame()
 
         self.__clock.tick(self.__program_fps)
 
@@ -185,150 +335,196 @@ class VideoPlayer:
         if not self.__audio_path:
             return
 
-        self.__buttons_scroll_view.clear_content()
-
-        self.__video_frame.load(self.__video_path, self.__audio_path)
-        self.__video_frame.set_interval(self.__program_fps)
+        # e.g. an unsupported wav format
+        try:
+            self.__video_frame.load(
+                self.__video_path, self.__audio_path, self.__follow
+            )
+        except (OSError, ValueError) as e:
+            self.__video_frame.close()
+            self.__segmentation_worker.stop()
+            self.__index = None
+            self.__clear_index()
+            self.__error_text.text = "cannot open video: " + str(e)
+            return
         self.__process_video()
 
         self.__play_button.visible = True
         self.__pause_button.visible = True
         self.__stop_button.visible = True
 
-    # process current video
+    # process current video in the background
     def __process_video(self):
-        scenes = detect(
+        self.__index = None
+        self.__index_params = self.__segmenter.params
+        self.__clear_index()
+        self.__error_text.text = ""
+        # the audio of a growing recording is not complete either
+        audio_assisted = self.__audio_assisted and not self.__follow
+        self.__segmentation_worker.start(
             self.__video_path,
-            AdaptiveDetector(adaptive_threshold=self.__scene_threshold),
-            show_progress=True,
+            self.__audio_path if audio_assisted else None,
+            self.__follow,
         )
-        self.__make_scene_buttons(scenes)
 
-    # make index buttons for scenes
-    def __make_scene_buttons(
-        self, scenes: list[tuple[FrameTimecode, FrameTimecode]]
-    ) -> None:
-        font_size: int = 15
-        width: int = 80
-        height: int = 20
-        margin_x: int = 5
-        margin_y: int = 5
-
-        scene_buttons = []
-
-        y = margin_y
-        for i, scene in enumerate(scenes):
-            time = scene[0].get_seconds()
-            scene_button = ui.Button(
-                self.__screen,
-                margin_x,
-                y,
-                width,
-                height,
-                pygame.font.SysFont(None, font_size),
-                "scene_" + str(i + 1),
-                lambda t=time: self.__video_frame.jump_to(t),
-                "#50555e",
-                "#666c78",
-                "#7a8291",
-            )
-            self.__buttons_scroll_view.add_to_content(scene_button)
-            scene_buttons.append(scene_button)
+    # add index buttons for the scenes found by the segmentation worker so far
+    def __handle_segmentation_events(self):
+        for kind, payload in self.__segmentation_worker.poll():
+            if kind == segmentation.worker.KEYFRAMES:
+                keyframes, _ = payload
+                self.__video_frame.set_keyframes(keyframes)
+            elif kind == segmentation.worker.SCENE:
+                fps, scene, thumbnails = payload
+                self.__make_scene_buttons(fps, [scene], thumbnails)
+            elif kind == segmentation.worker.PROGRESS:
+                done, total = payload
+                if self.__follow:
+                    caption = "{} - following, {} frames indexed".format(self.title, done)
+                else:
+                    caption = "{} - indexing {}%".format(
+                        self.title, done * 100 // max(1, total)
+                    )
+                pygame.display.set_caption(caption)
+            elif kind == segmentation.worker.DONE:
+                self.__index = payload
+                pygame.display.set_caption(self.title)
+
+                # the thresholds were changed while indexing
+                if self.__index_params != self.__segmenter.params:
+                    self.__rebuild_index()
+                # cached scenes are not streamed
+                elif self.__scene_count == 0:
+                    self.__make_scene_buttons(
+                        self.__index.fps, self.__index.scenes, self.__index.thumbnails
+                    )
+            elif kind == segmentation.worker.PROXY:
+                self.__video_frame.use_proxy(payload, segmentation.proxy.PROXY_API)
+            elif kind == segmentation.worker.ERROR:
+                self.__error_text.text = "segmentation failed: " + payload
+                pygame.display.set_caption(self.title)
+
+    # set the threshold of a level from its input, and rebuild the index
+    # if there is one already
+    def __retune(self, level: int, text: str):
+        field = self.__threshold_inputs[level]
+        try:
+            value = float(text)
+        except ValueError:
+            value = 0
+        if value <= 0:
+            field.text = "{:g}".format(self.__segmenter.get_threshold(level))
+            return
 
-            last_position = self.__make_shot_buttons(
-                scene_button, scene, font_size, width, height
+        field.text = "{:g}".format(value)
+        self.__segmenter.set_threshold(level, value)
+        if self.__index is not None:
+            self.__rebuild_index()
+
+    # rebuild the scenes, shots and subshots and their index rows from the
+    # scores of the index, only new cuts between samples are decoded again
+    def __rebuild_index(self):
+        with self.__profiler.measure("retune"):
+            self.__segmenter.build(self.__index, self.__video_path)
+            self.__index_params = self.__segmenter.params
+            self.__clear_index()
+            self.__make_scene_buttons(
+                self.__index.fps, self.__index.scenes, self.__index.thumbnails
             )
-            if last_position > 0:
-                y = last_position
-            else:
-                y = scene_button.y + height
-            y += margin_y
-
-    # make index buttons for shots
-    def __make_shot_buttons(
-        self,
-        scene_button: ui.Button,
-        scene: tuple[FrameTimecode, FrameTimecode],
-        font_size: int = 15,
-        width: int = 80,
-        height: int = 20,
-        margin_x: int = 5,
-        margin_y: int = 5,
-        subshot: bool = False,
-        min_length: int = 15,
-    ) -> int:
-        buttons = []
-        last_position = 0
-
-        threshold = self.__shot_threshold if not subshot else self.__subshot_threshold
-        shots = detect(
-            self.__video_path,
-            AdaptiveDetector(adaptive_threshold=threshold),
-            show_progress=True,
-            start_time=scene[0].get_timecode(),
-            end_time=scene[1].get_timecode(),
-        )
 
-        start_position = (
-            scene_button.x + scene_button.width + margin_x,
-            scene_button.y + scene_button.height + margin_y,
-        )
-        y = scene_button.y + scene_button.height + margin_y
-        if not subshot and shots.__len__() == 0:
-            time = scene[0].get_seconds()
-            button = button = ui.Button(
-                self.__screen,
-                start_position[0],
-                y,
-                width,
-                height,
-                pygame.font.SysFont(None, font_size),
-                "shot_1",
-                lambda t=time: self.__video_frame.jump_to(t),
-                "#50555e",
-                "#666c78",
-                "#7a8291",
-            )
-            self.__buttons_scroll_view.add_to_content(button)
-            buttons.append(button)
-        else:
-            for i, shot in enumerate(shots):
-                time = shot[0].get_seconds()
+    # remove the index rows, timeline ticks and previews
+    def __clear_index(self):
+        self.__buttons_scroll_view.clear_content()
+        self.__scene_count = 0
+        self.__timeline.clear_ticks()
+        self.__preview_times = []
+        self.__previews = {}
 
-                button_text = "subshot_" if subshot else "shot_"
-                button_text += str(i + 1)
-                button = ui.Button(
-                    self.__screen,
-                    start_position[0],
-                    y,
-                    width,
-                    height,
-                    pygame.font.SysFont(None, font_size),
-                    button_text,
-                    lambda t=time: self.__video_frame.jump_to(t),
-                    "#50555e",
-                    "#666c78",
-                    "#7a8291",
+    # add index rows for scenes, shots and subshots below the existing ones,
+    # thumbnails can be anything that gets a thumbnail array by frame
+    def __make_scene_buttons(
+        self, fps: float, scenes: list[segmentation.Segment], thumbnails=None
+    ) -> None:
+        rows = []
+        self.__make_segment_rows(fps, scenes, thumbnails, rows, self.__scene_count + 1)
+        self.__buttons_scroll_view.add_rows(rows)
+        self.__scene_count += len(scenes)
+
+        # segment starts are ticks on the timeline and previews while dragging
+        self.__timeline.add_ticks([(time, level) for _, level, time, _ in rows])
+        for _, _, time, thumbnail in rows:
+            if thumbnail is None:
+                continue
+            if not self.__preview_times or time > self.__preview_times[-1]:
+                self.__preview_times.append(time)
+            self.__previews[time] = thumbnail
+
+    # get the preview of the segment at a time in seconds, None if there is none
+    def __get_preview(self, time: float, width: int = 160) -> pygame.Surface:
+        i = bisect_right(self.__preview_times, time) - 1
+        if i < 0:
+            return None
+
+        # thumbnails are scaled once, when they are first shown
+        start = self.__preview_times[i]
+        preview = self.__previews[start]
+        if not isinstance(preview, pygame.Surface):
+            image = pygame.image.frombuffer(preview, preview.shape[1::-1], "RGB")
+            height = round(width * preview.shape[0] / preview.shape[1])
+            preview = pygame.transform.smoothscale(image, (width, height))
+            self.__previews[start] = preview
+        return preview
+
+    # make index rows of (label, level, time, thumbnail) for a list of
+    # segments and their children
+    def __make_segment_rows(
+        self,
+        fps: float,
+        segments: list[segmentation.Segment],
+        thumbnails,
+        rows: list,
+        first_number: int = 1,
+    ) -> None:
+        for i, segment in enumerate(segments):
+            thumbnail = None
+            if thumbnails is not None:
+                thumbnail = thumbnails.get(segment.start)
+
+            rows.append(
+                (
+                    segment.name + "_" + str(first_number + i),
+                    segment.level,
+                    segment.start / fps,
+                    thumbnail,
                 )
-                self.__buttons_scroll_view.add_to_content(button)
-                buttons.append(button)
-
-                # subshot
-                last = 0
-                shot_length = shot[1].get_seconds() - shot[0].get_seconds()
-                if len(buttons) > 1 and shot_length > min_length:
-                    last = self.__make_shot_buttons(
-                        button, shot, subshot=True, min_length=min_length
-                    )
-
-                if last > 0:
-                    last_position = max(last_position, last)
-                    y = last_position
-                else:
-                    y = button.y + height
-                y += margin_y
+            )
+            self.__make_segment_rows(fps, segment.children, thumbnails, rows)
 
-        if len(buttons) > 0:
-            last_position = max(last_position, buttons[-1].y + buttons[-1].height)
+    # make a button to show index rows
+    def __make_index_button(self, width: int = 110, height: int = 20) -> ui.Button:
+        return ui.Button(
+            self.__screen,
+            0,
+            0,
+            width,
+            height,
+            self.__index_font,
+            "",
+            None,
+            "#50555e",
+            "#666c78",
+            "#7a8291",
+        )
 
-        return last_position
+    # show an index row on a button
+    def __bind_index_button(self, button: ui.Button, row: tuple, margin_x: int = 5):
+        label, level, time, thumbnail = row
+        button.x = margin_x + level * (button.width + margin_x)
+        button.label = label
+        button.on_click = lambda: self.__video_frame.jump_to(time)
+
+        # the icon refers to the thumbnail array instead of copying it
+        button.icon = None
+        if thumbnail is not None:
+            button.icon = pygame.image.frombuffer(
+                thumbnail, thumbnail.shape[1::-1], "RGB"
+            )